@@ -1,97 +1,771 @@
+from dslogtocsvlibrary.dslogfeed import DsLogFeed
 from dslogtocsvlibrary.dslogstream import DsLogStream
-from pathlib import Path
+from dslogtocsvlibrary.entry.log_entry import LogEntry
+from dslogtocsvlibrary.entry.parse_date import format_nanoseconds
+from dslogtocsvlibrary.entry.pdp_data import PdpData
+from dslogtocsvlibrary.entry.pdp_meta_data import PdpMetaData
+from dslogtocsvlibrary.entry.pdp_type import PdpType
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from manifest import EMPTY, FAILED, PROCESSED, Manifest
+from rollups import ROLLUP_COLUMNS, ROLLUP_FIELDNAMES, TIERS, Rollups, total_current
+from battery_health import (
+    FLEET_FILENAME,
+    HEALTH_COLUMNS,
+    HEALTH_FIELDNAMES,
+    HealthFit,
+    write_fleet,
+)
+from compressed_io import (
+    COMPRESSIONS,
+    detect_compression,
+    open_compressed,
+    strip_compression,
+    with_compression,
+)
+import argparse
+import functools
+import hashlib
 import os
 import csv
-import sys
+import numpy as np
+
+
+# Rows are handed to the CSV writer in batches of this many, so memory use
+# stays flat no matter how long the log is.
+ROW_BUFFER_SIZE = 4096
+
+# Output formats accepted by DSConvertor and the file extension each writes.
+# Parquet and Feather (Arrow IPC) need the optional pyarrow package.
+OUTPUT_EXTENSIONS = {"csv": ".csv", "parquet": ".parquet", "feather": ".feather"}
+
+# Summary modes: "off" writes only the full output, "alongside" also writes
+# <name>.summary.csv (date, voltage, total_current, as filter_csv.py would
+# produce), and "only" writes just the summary.
+SUMMARY_MODES = ("off", "alongside", "only")
+SUMMARY_FIELDNAMES = ["date", "voltage", "total_current"]
+# The only to_arrays() columns a summary needs; the rest are never decoded
+SUMMARY_COLUMNS = ("timestamp", "voltage", "pdp_type", "pdp_data_currents")
+
+# Error recorded for a log whose conversion killed its worker process
+WORKER_DIED = "conversion worker process died"
+
+# Records per Parquet row group / Arrow record batch (about 20 minutes of
+# 50 Hz data). Columnar outputs are decoded and written one group at a time.
+ROW_GROUP_SIZE = 65536
+
+# Float columns are stored as float32 in columnar outputs; the DS log fields
+# carry far less precision than that.
+FLOAT_COLUMNS = (
+    "trip_time",
+    "packet_loss",
+    "voltage",
+    "rio",
+    "can",
+    "wifi",
+    "bandwidth",
+    "pdp_data_voltage",
+    "pdp_data_resistance",
+    "pdp_data_temperature",
+)
+
+
+def is_dslog(file):
+    # Raw logs may also be stored gzip/zstd-compressed
+    return strip_compression(file).endswith(".dslog")
+
+
+def log_stem(file):
+    return strip_compression(file)[: -len(".dslog")]
+
+
+@functools.lru_cache(maxsize=None)
+def slot_names(cls):
+    # Entries use __slots__ rather than a __dict__; collect the slot names
+    # in declaration order (base classes first) so CSV columns keep their order.
+    # Cached per class, since entry_fields() needs them for every record.
+    names = []
+    for klass in reversed(cls.__mro__):
+        names.extend(getattr(klass, "__slots__", ()))
+    return tuple(names)
+
+
+def entry_fields(entry):
+    return {name: getattr(entry, name) for name in slot_names(type(entry))}
+
+
+def csv_fieldnames(pdp_class):
+    fieldnames = [
+        name for name in slot_names(LogEntry) if name not in ("pdp_meta_data", "pdp_data")
+    ]
+    fieldnames += [f"pdp_meta_{name}" for name in slot_names(PdpMetaData)]
+    fieldnames += [f"pdp_data_{name}" for name in slot_names(pdp_class or PdpData)]
+    return fieldnames
+
+
+def flatten_entry(entry):
+    rec = entry_fields(entry)
+
+    # Flatten pdp_meta_data
+    if rec.get("pdp_meta_data") is not None:
+        for k, v in entry_fields(entry.pdp_meta_data).items():
+            rec[f"pdp_meta_{k}"] = v
+        rec.pop("pdp_meta_data")
+
+    # Flatten pdp_data
+    if rec.get("pdp_data") is not None:
+        for k, v in entry_fields(entry.pdp_data).items():
+            rec[f"pdp_data_{k}"] = v
+        rec.pop("pdp_data")
+
+    return rec
+
+
+def summary_rows(columns):
+    dates = format_nanoseconds(columns["timestamp"])
+    voltages = columns["voltage"].tolist()
+    totals = total_current(columns).tolist()
+    # filter_csv.py sums an empty currents list to the integer 0 for records
+    # without a PDP; keep that text so both paths produce the same file.
+    for index in np.flatnonzero(columns["pdp_type"] == PdpType.NONE.value).tolist():
+        totals[index] = 0
+    return zip(dates, voltages, totals)
+
+
+def pad_currents(columns, channels):
+    # Widen the currents matrix to channels with NaN, as whole-file decoding
+    # does for records of a narrower PDP
+    currents = columns["pdp_data_currents"]
+    if currents.shape[1] < channels:
+        padded = np.full((len(currents), channels), np.nan, dtype=np.float32)
+        padded[:, : currents.shape[1]] = currents
+        columns["pdp_data_currents"] = padded
+    return columns
+
+
+def load_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401  (registers pyarrow.parquet)
+    except ImportError as e:
+        raise RuntimeError(
+            "Parquet/Feather output needs pyarrow (pip install pyarrow)"
+        ) from e
+    return pyarrow
+
+
+def arrow_schema(pa, channels):
+    fields = [pa.field("timestamp", pa.timestamp("ns", tz="UTC"))]
+    for name in ("trip_time", "packet_loss", "voltage", "rio"):
+        fields.append(pa.field(name, pa.float32()))
+    fields.append(pa.field("status", pa.uint8()))
+    for name in (
+        "brownout",
+        "watchdog",
+        "ds_teleop",
+        "ds_disabled",
+        "robot_teleop",
+        "robot_autonomous",
+        "robot_disabled",
+    ):
+        fields.append(pa.field(name, pa.uint8()))
+    for name in ("can", "wifi", "bandwidth"):
+        fields.append(pa.field(name, pa.float32()))
+    fields.append(pa.field("pdp_id", pa.uint8()))
+    fields.append(pa.field("pdp_type", pa.uint8()))
+    fields.append(pa.field("pdp_data_pdp_id", pa.uint8()))
+    # Logs without any PDP have no current channels at all
+    if channels:
+        fields.append(pa.field("pdp_data_currents", pa.list_(pa.float32(), channels)))
+    for name in ("pdp_data_voltage", "pdp_data_resistance", "pdp_data_temperature"):
+        fields.append(pa.field(name, pa.float32()))
+    return pa.schema(fields)
+
+
+def arrow_table(pa, schema, columns):
+    arrays = []
+    for field in schema:
+        values = columns[field.name]
+        if field.name == "pdp_data_currents":
+            flat = pa.array(values.ravel(), type=pa.float32())
+            arrays.append(pa.FixedSizeListArray.from_arrays(flat, values.shape[1]))
+        elif field.name in FLOAT_COLUMNS:
+            arrays.append(pa.array(values.astype("float32"), type=field.type))
+        else:
+            arrays.append(pa.array(values, type=field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+class OutputWriter(ABC):
+    # Writes to <path>.part and renames it into place on close, so a failed
+    # conversion never leaves a truncated file behind under the final name.
+    # Records arrive as one or more DsLogStream pieces; the file is only
+    # created once there is a record to write. self.count is the number of
+    # rows the file holds, which close() reports.
+    def __init__(self, filename, path, compression="none"):
+        self.filename = filename
+        self.path = path
+        self.compression = compression
+        self.part_path = path + ".part"
+        self.handle = None
+        self.count = 0
+
+    def write(self, log_stream):
+        if len(log_stream) == 0:
+            return
+        if self.handle is None:
+            self.handle = self.open(log_stream)
+        self.count += self.append(log_stream)
+
+    def close(self):
+        if self.handle is None:
+            return None
+        self.finish()
+        os.replace(self.part_path, self.path)
+        return self.filename, self.count
+
+    def abort(self):
+        if self.handle is not None:
+            try:
+                self.finish()
+            except Exception:
+                pass
+        if os.path.exists(self.part_path):
+            os.remove(self.part_path)
+
+    @abstractmethod
+    def open(self, log_stream):
+        pass
+
+    @abstractmethod
+    def append(self, log_stream):
+        # Write the piece; return the number of rows written
+        pass
+
+    def finish(self):
+        self.handle.close()
+
+
+class CSVWriter(OutputWriter):
+    def open(self, log_stream):
+        csvfile = open_compressed(self.part_path, "wt", self.compression, newline="")
+        # The header follows from the PDP type of the first record
+        pdp_class = log_stream.pdp_map[log_stream[0].pdp_meta_data.type]
+        self.writer = csv.DictWriter(csvfile, fieldnames=csv_fieldnames(pdp_class))
+        self.writer.writeheader()
+        return csvfile
+
+    def append(self, log_stream):
+        count = 0
+        rows = []
+        for entry in log_stream:
+            rows.append(flatten_entry(entry))
+            if len(rows) >= ROW_BUFFER_SIZE:
+                self.writer.writerows(rows)
+                count += len(rows)
+                rows.clear()
+        self.writer.writerows(rows)
+        return count + len(rows)
+
+
+class SummaryWriter(OutputWriter):
+    # Built straight from the decoded arrays, so the currents never go
+    # through text and back the way filter_csv.py has to.
+    def open(self, log_stream):
+        csvfile = open_compressed(self.part_path, "wt", self.compression, newline="")
+        self.writer = csv.writer(csvfile)
+        self.writer.writerow(SUMMARY_FIELDNAMES)
+        return csvfile
+
+    def append(self, log_stream):
+        for start in range(0, len(log_stream), ROW_GROUP_SIZE):
+            columns = log_stream.to_arrays(start, start + ROW_GROUP_SIZE, SUMMARY_COLUMNS)
+            self.writer.writerows(summary_rows(columns))
+        return len(log_stream)
+
+
+class RollupWriter(OutputWriter):
+    # 1 s / 10 s / enabled-period rollups (see rollups.py), one row per
+    # bucket. Rows are kept until finish() and written grouped by tier, so
+    # the file doesn't depend on how the log was cut into pieces; even a
+    # long log only has a few thousand of them.
+    def open(self, log_stream):
+        csvfile = open_compressed(self.part_path, "wt", self.compression, newline="")
+        self.writer = csv.writer(csvfile)
+        self.writer.writerow(ROLLUP_FIELDNAMES)
+        self.rollups = Rollups()
+        self.rows = []
+        return csvfile
+
+    def append(self, log_stream):
+        for start in range(0, len(log_stream), ROW_GROUP_SIZE):
+            columns = log_stream.to_arrays(start, start + ROW_GROUP_SIZE, ROLLUP_COLUMNS)
+            self.rows += self.rollups.add(columns)
+        # Nothing is written until finish()
+        return 0
+
+    def finish(self):
+        if self.rollups is not None:
+            self.rows += self.rollups.close()
+            self.rows.sort(key=lambda row: TIERS.index(row[0]))
+            self.writer.writerows(self.rows)
+            self.count += len(self.rows)
+            self.rollups = self.rows = None
+        self.handle.close()
+
+
+class HealthWriter(OutputWriter):
+    # Battery resistance fit per enabled period (see battery_health.py). The
+    # fits are also kept in self.fits so the manifest can cache them.
+    def open(self, log_stream):
+        csvfile = open_compressed(self.part_path, "wt", self.compression, newline="")
+        self.writer = csv.writer(csvfile)
+        self.writer.writerow(HEALTH_FIELDNAMES)
+        self.fit = HealthFit()
+        self.fits = []
+        return csvfile
+
+    def append(self, log_stream):
+        count = 0
+        for start in range(0, len(log_stream), ROW_GROUP_SIZE):
+            columns = log_stream.to_arrays(start, start + ROW_GROUP_SIZE, HEALTH_COLUMNS)
+            count += self.record(self.fit.add_columns(columns))
+        return count
+
+    def record(self, fits):
+        self.fits += fits
+        self.writer.writerows(fits)
+        return len(fits)
+
+    def finish(self):
+        if self.fit is not None:
+            self.count += self.record(self.fit.close())
+            self.fit = None
+        self.handle.close()
+
+
+def writer_fits(writers):
+    for writer in writers:
+        if isinstance(writer, HealthWriter) and writer.handle is not None:
+            return writer.fits
+    return None
+
+
+class ColumnarWriter(OutputWriter):
+    def __init__(self, filename, path, outputFormat):
+        super().__init__(filename, path)
+        self.outputFormat = outputFormat
+        self.held = []
+
+    def write(self, log_stream):
+        # The currents column is as wide as the widest PDP in the first piece
+        # (for a whole file, the whole log); a wider PDP in a later piece
+        # widens the file (see widen()). Leading pieces without any PDP are
+        # held back until a record with one shows that width.
+        if self.handle is None and log_stream.channels == 0:
+            if len(log_stream):
+                self.held.append(log_stream)
+            return
+        if self.handle is None and len(log_stream):
+            self.handle = self.open(log_stream)
+        self.release()
+        super().write(log_stream)
+
+    def release(self):
+        held, self.held = self.held, []
+        for log_stream in held:
+            super().write(log_stream)
+
+    def close(self):
+        if self.handle is None and self.held:
+            self.handle = self.open(self.held[0])
+        self.release()
+        return super().close()
+
+    def open(self, log_stream):
+        self.pa = load_pyarrow()
+        self.channels = log_stream.channels
+        self.schema = arrow_schema(self.pa, self.channels)
+        return self.new_writer()
+
+    def new_writer(self):
+        if self.outputFormat == "parquet":
+            return self.pa.parquet.ParquetWriter(self.part_path, self.schema, compression="zstd")
+        options = self.pa.ipc.IpcWriteOptions(compression="zstd")
+        return self.pa.ipc.new_file(self.part_path, self.schema, options=options)
+
+    def append(self, log_stream):
+        for start in range(0, len(log_stream), ROW_GROUP_SIZE):
+            columns = log_stream.to_arrays(start, start + ROW_GROUP_SIZE)
+            if columns["pdp_data_currents"].shape[1] > self.channels:
+                self.widen(columns["pdp_data_currents"].shape[1])
+            columns = pad_currents(columns, self.channels)
+            self.handle.write_table(arrow_table(self.pa, self.schema, columns))
+        return len(log_stream)
+
+    def widen(self, channels):
+        # A streamed log switched to a wider PDP partway through. Rewrite
+        # what was written so far with the wider currents column, one batch
+        # at a time, so the file ends up as whole-file decoding would write it.
+        pa = self.pa
+        old_path = self.part_path + ".old"
+        self.handle.close()
+        os.replace(self.part_path, old_path)
+        old_channels = self.channels
+        self.channels = channels
+        self.schema = arrow_schema(pa, channels)
+        self.handle = self.new_writer()
+        index = self.schema.get_field_index("pdp_data_currents")
+        try:
+            with pa.memory_map(old_path) as source:
+                if self.outputFormat == "parquet":
+                    batches = pa.parquet.ParquetFile(source).iter_batches(batch_size=ROW_GROUP_SIZE)
+                else:
+                    reader = pa.ipc.open_file(source)
+                    batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+                for batch in batches:
+                    table = pa.Table.from_batches([batch])
+                    if old_channels:
+                        flat = table.column("pdp_data_currents").combine_chunks().flatten()
+                        currents = flat.to_numpy(zero_copy_only=False).reshape(-1, old_channels)
+                        table = table.drop_columns(["pdp_data_currents"])
+                    else:
+                        currents = np.empty((len(table), 0), dtype=np.float32)
+                    currents = pad_currents({"pdp_data_currents": currents}, channels)["pdp_data_currents"]
+                    flat = pa.array(currents.ravel(), type=pa.float32())
+                    table = table.add_column(
+                        index,
+                        self.schema.field(index),
+                        pa.FixedSizeListArray.from_arrays(flat, channels),
+                    )
+                    self.handle.write_table(table)
+        finally:
+            os.remove(old_path)
+
+
+class StreamConversion:
+    # Converts a .dslog while its bytes are still arriving (e.g. as the
+    # file object handed to MediaIoBaseDownload): every write() decodes the
+    # records completed so far and appends them to the outputs, and close()
+    # finishes the files and returns the same result dict as convertFile.
+    # The raw bytes are only kept on disk when archive_path is given.
+    def __init__(self, convertor, file, archive_path=None):
+        self.file = file
+        self.result = convertor.newResult(file)
+        self.feed = DsLogFeed()
+        self.digest = hashlib.sha256()
+        self.writers = convertor.openWriters(file)
+        self.archive_path = archive_path
+        self.archive = open(archive_path + ".part", "wb") if archive_path else None
+
+    def write(self, data):
+        self.digest.update(data)
+        if self.archive is not None:
+            self.archive.write(data)
+        self.feed.write(data)
+        # After a decode error keep taking bytes so the hash (and archive)
+        # still cover the whole file
+        if self.result["error"] is None:
+            self.decode(self.feed.read)
+        return len(data)
+
+    def decode(self, read):
+        try:
+            log_stream = read()
+            self.result["records"] = self.feed.records
+            if log_stream is not None:
+                for writer in self.writers:
+                    writer.write(log_stream)
+        except Exception as e:
+            import traceback
+            print(f"[!] Failed to process {self.file}: {e}")
+            print("[!] Full traceback:")
+            traceback.print_exc()
+            self.result["error"] = str(e)
+            for writer in self.writers:
+                writer.abort()
+
+    def close(self):
+        if self.result["error"] is None:
+            self.decode(self.feed.close)
+        if self.result["error"] is None:
+            for out_filename, count in filter(None, (w.close() for w in self.writers)):
+                self.result["outputs"].append(out_filename)
+                self.result["rows"][out_filename] = count
+            self.result["health"] = writer_fits(self.writers)
+        if self.archive is not None:
+            self.archive.close()
+            os.replace(self.archive_path + ".part", self.archive_path)
+        self.result["size"] = self.feed.size
+        self.result["hash"] = self.digest.hexdigest()
+        return self.result
+
+    def abort(self):
+        for writer in self.writers:
+            writer.abort()
+        if self.archive is not None:
+            self.archive.close()
+            os.remove(self.archive_path + ".part")
 
 
 class DSConvertor:
-    def __init__(self, dsLogDir=""):
+    def __init__(self, dsLogDir="", outputFormat="csv", summary="off", compression="none", rollups=False, health=False):
+        if outputFormat not in OUTPUT_EXTENSIONS:
+            raise ValueError(f"Unsupported output format {outputFormat!r}")
+        if summary not in SUMMARY_MODES:
+            raise ValueError(f"Unsupported summary mode {summary!r}")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unsupported compression {compression!r}")
         self.dsLogDir = dsLogDir
+        self.outputFormat = outputFormat
+        self.summary = summary
+        self.rollups = rollups
+        self.health = health
+        # CSV outputs only; Parquet and Feather are already zstd-compressed
+        self.compression = compression
         self.destinationDr = os.path.join(
             os.path.dirname(os.path.realpath(__file__)), "csvDSLogs"
         )
-        self.exclusionListFP = os.path.join(
-            os.path.dirname(os.path.realpath(__file__)), "exclusionListFP.txt"
-        )
+        self.manifest = Manifest()
 
         # Ensure output directory exists
         os.makedirs(self.destinationDr, exist_ok=True)
 
-        # Ensure exclusion file exists
-        if not os.path.exists(self.exclusionListFP):
-            Path(self.exclusionListFP).touch()
-
-    def processDSLogs(self):
-        for file in os.listdir(self.dsLogDir):
-            file_path = os.path.join(self.dsLogDir, file)
-
-            # Only process .dslog files not already excluded
-            with open(self.exclusionListFP, "r") as exF:
-                exclusions = exF.read().splitlines()
-
-            if file.endswith(".dslog") and file not in exclusions:
-                print(f"[*] Processing {file}...")
-
-                try:
-                    records = []
-                    # Open DS log in binary mode
-                    with open(file_path, "rb") as f:
-                        log_stream = DsLogStream(f)
-                        for entry in log_stream:
-                            rec = entry.__dict__.copy()  # shallow copy
-
-                            # Flatten pdp_meta_data
-                            if hasattr(entry, "pdp_meta_data") and entry.pdp_meta_data is not None:
-                                for k, v in entry.pdp_meta_data.__dict__.items():
-                                    rec[f"pdp_meta_{k}"] = v
-                                rec.pop("pdp_meta_data")
-
-                            # Flatten pdp_data
-                            if hasattr(entry, "pdp_data") and entry.pdp_data is not None:
-                                for k, v in entry.pdp_data.__dict__.items():
-                                    rec[f"pdp_data_{k}"] = v
-                                rec.pop("pdp_data")
-
-                            records.append(rec)
-
-                    if not records:
-                        print(f"[!] No records found in {file}")
+    def processDSLogs(self, jobs=1):
+        # Only process .dslog files the manifest has not recorded as done
+        pending = [
+            file
+            for file in os.listdir(self.dsLogDir)
+            if is_dslog(file) and not self.manifest.is_processed(file)
+        ]
+
+        results = []
+        if jobs > 1 and len(pending) > 1:
+            results = self.convertParallel(pending, jobs)
+        else:
+            for file in pending:
+                results.append(self.recordResult(self.convertFile(file)))
+
+        if self.health and any(r.get("health") is not None for r in results):
+            batteries = write_fleet(self.manifest, os.path.join(self.destinationDr, FLEET_FILENAME))
+            print(f"[+] Updated {FLEET_FILENAME} ({batteries} batteries).")
+        self.printSummary(results)
+        return results
+
+    def convertParallel(self, pending, jobs):
+        # Workers only convert; this process alone records results in the
+        # manifest. A worker that dies (segfault, OOM kill) breaks the whole
+        # pool, and every file still on it fails with BrokenProcessPool.
+        # Those files are converted one at a time in a process of their own
+        # until the one that kills its worker turns up; the rest go back to
+        # a new pool.
+        results = []
+        while pending:
+            lost = []
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                futures = {pool.submit(self.convertFile, file): file for file in pending}
+                for future in as_completed(futures):
+                    file = futures[future]
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool:
+                        lost.append(file)
                         continue
+                    except Exception as e:
+                        result = self.failedResult(file, e)
+                    results.append(self.recordResult(result))
+            pending = []
+            for index, file in enumerate(lost):
+                result = self.convertAlone(file)
+                results.append(self.recordResult(result))
+                if result["error"] == WORKER_DIED:
+                    pending = lost[index + 1:]
+                    break
+        return results
+
+    def convertAlone(self, file, mp_context=None):
+        # Convert file in a worker process of its own, so a worker that dies
+        # fails only this file
+        with ProcessPoolExecutor(max_workers=1, mp_context=mp_context) as pool:
+            try:
+                return pool.submit(self.convertFile, file).result()
+            except BrokenProcessPool:
+                return self.failedResult(file, WORKER_DIED)
+            except Exception as e:
+                return self.failedResult(file, e)
+
+    def failedResult(self, file, error):
+        print(f"[!] Failed to process {file}: {error}")
+        result = self.newResult(file)
+        result["error"] = str(error)
+        return result
+
+    def newResult(self, file):
+        return {
+            "file": file,
+            "outputs": [],
+            # Records decoded from the log, and rows written to each output
+            "records": 0,
+            "rows": {},
+            "error": None,
+            "size": None,
+            "hash": None,
+            "health": None,
+        }
+
+    def convertFile(self, file):
+        file_path = os.path.join(self.dsLogDir, file)
+        result = self.newResult(file)
+        print(f"[*] Processing {file}...")
 
-                    # Prepare CSV file
-                    csv_filename = file[:-6] + ".csv"
-                    csv_path = os.path.join(self.destinationDr, csv_filename)
+        writers = self.openWriters(file)
+        try:
+            # Open DS log in binary mode. Plain logs are memory-mapped;
+            # gzip/zstd ones are inflated into memory first.
+            compression = detect_compression(file_path)
+            with open_compressed(file_path, "rb", compression) as f:
+                log_stream = DsLogStream(f if compression == "none" else f.read())
+                result["size"] = len(log_stream.buffer)
+                result["hash"] = hashlib.sha256(log_stream.buffer).hexdigest()
+                result["records"] = len(log_stream)
+                for writer in writers:
+                    writer.write(log_stream)
+                written = [writer.close() for writer in writers]
 
-                    # Use fieldnames from the first record
-                    fieldnames = list(records[0].keys())
+            for out_filename, count in filter(None, written):
+                result["outputs"].append(out_filename)
+                result["rows"][out_filename] = count
+            result["health"] = writer_fits(writers)
 
-                    with open(csv_path, "w", newline="") as csvfile:
-                        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                        writer.writeheader()
-                        writer.writerows(records)
+        except Exception as e:
+            import traceback
+            print(f"[!] Failed to process {file}: {e}")
+            print("[!] Full traceback:")
+            traceback.print_exc()
+            result["error"] = str(e)
+            for writer in writers:
+                writer.abort()
 
-                    print(f"[+] Wrote {csv_filename} with {len(records)} records.")
-                    self.addToExclusionList(file)
+        return result
 
-                except Exception as e:
-                    import traceback
-                    print(f"[!] Failed to process {file}: {e}")
-                    print("[!] Full traceback:")
-                    traceback.print_exc()
+    def openStream(self, file, archive_path=None):
+        print(f"[*] Processing {file} as it downloads...")
+        return StreamConversion(self, file, archive_path)
+
+    def openWriters(self, file):
+        writers = []
+        if self.summary != "only":
+            out_filename, out_path = self.outputPath(file)
+            if self.outputFormat == "csv":
+                writers.append(CSVWriter(out_filename, out_path, self.compression))
+            else:
+                writers.append(ColumnarWriter(out_filename, out_path, self.outputFormat))
+        if self.summary != "off":
+            out_filename = with_compression(log_stem(file) + ".summary.csv", self.compression)
+            out_path = os.path.join(self.destinationDr, out_filename)
+            writers.append(SummaryWriter(out_filename, out_path, self.compression))
+        if self.rollups:
+            out_filename = with_compression(log_stem(file) + ".rollups.csv", self.compression)
+            out_path = os.path.join(self.destinationDr, out_filename)
+            writers.append(RollupWriter(out_filename, out_path, self.compression))
+        if self.health:
+            out_filename = with_compression(log_stem(file) + ".health.csv", self.compression)
+            out_path = os.path.join(self.destinationDr, out_filename)
+            writers.append(HealthWriter(out_filename, out_path, self.compression))
+        return writers
+
+    def recordResult(self, result):
+        if result["error"] is not None:
+            status = FAILED
+        elif not result["outputs"]:
+            print(f"[!] No records found in {result['file']}")
+            status = EMPTY
+        else:
+            for out_filename in result["outputs"]:
+                print(f"[+] Wrote {out_filename} with {result['rows'][out_filename]} rows.")
+            status = PROCESSED
+        if result.get("health") is not None:
+            # Cache the fits so the fleet table never needs this log again
+            self.manifest.set_health(result["file"], log_stem(result["file"]), result["health"])
+        self.manifest.mark(
+            result["file"],
+            status,
+            size=result.get("size"),
+            content_hash=result.get("hash"),
+            outputs=result["outputs"],
+        )
+        return result
+
+    def printSummary(self, results):
+        converted = [r for r in results if r["outputs"]]
+        failed = [r for r in results if r["error"] is not None]
+        empty = len(results) - len(converted) - len(failed)
+        records = sum(r["records"] for r in converted)
+        print(
+            f"[i] Converted {len(converted)} file(s) ({records} records); "
+            f"{empty} empty, {len(failed)} failed."
+        )
+        for r in failed:
+            print(f"  └─ {r['file']}: {r['error']}")
 
-    def addToExclusionList(self, fileName=""):
-        with open(self.exclusionListFP, "a") as f:
-            f.write(fileName + "\n")
+    def outputPath(self, file):
+        out_filename = log_stem(file) + OUTPUT_EXTENSIONS[self.outputFormat]
+        if self.outputFormat == "csv":
+            out_filename = with_compression(out_filename, self.compression)
+        return out_filename, os.path.join(self.destinationDr, out_filename)
 
 
 def _main():
     # Allow passing the directory to process as the first CLI argument.
     # If omitted, fall back to the hard-coded path for backward compatibility.
     default_dir = r"/Users/jacksonyoes/Downloads/dslogs"
-    dslogdir = sys.argv[1] if len(sys.argv) > 1 else default_dir
-    dsconv = DSConvertor(dslogdir)
-    dsconv.processDSLogs()
+    parser = argparse.ArgumentParser(description="Convert .dslog files to CSV or columnar files.")
+    parser.add_argument("dslogdir", nargs="?", default=default_dir)
+    parser.add_argument(
+        "--format",
+        choices=sorted(OUTPUT_EXTENSIONS),
+        default="csv",
+        help="output format (parquet and feather need pyarrow)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of files to convert in parallel (default: 1)",
+    )
+    parser.add_argument(
+        "--compress",
+        choices=COMPRESSIONS,
+        default="none",
+        help="compress CSV outputs while writing them (zstd needs zstandard)",
+    )
+    parser.add_argument(
+        "--summary",
+        choices=SUMMARY_MODES,
+        default="off",
+        help="also (alongside) or only write the date/voltage/total_current summary CSV",
+    )
+    parser.add_argument(
+        "--rollups",
+        action="store_true",
+        help="also write <name>.rollups.csv with 1 s, 10 s and per-enabled-period rollups",
+    )
+    parser.add_argument(
+        "--health",
+        action="store_true",
+        help="also fit battery internal resistance per enabled period (<name>.health.csv, battery_fleet.csv)",
+    )
+    args = parser.parse_args()
+    dsconv = DSConvertor(
+        args.dslogdir,
+        outputFormat=args.format,
+        summary=args.summary,
+        compression=args.compress,
+        rollups=args.rollups,
+        health=args.health,
+    )
+    dsconv.processDSLogs(jobs=args.jobs)
 
 
 if __name__ == "__main__":
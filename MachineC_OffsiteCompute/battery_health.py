@@ -0,0 +1,130 @@
+"""Battery internal-resistance fits (V = V0 - R * I per enabled period) and the fleet table."""
+
+import csv
+import os
+from collections import defaultdict
+from typing import Dict, List
+
+import numpy as np
+
+from dslogtocsvlibrary.entry.parse_date import format_nanoseconds
+from rollups import ENABLED_TIER, EnabledPeriods, Rollup, total_current
+
+HEALTH_FIELDNAMES = [
+    "start",
+    "end",
+    "records",
+    "resistance",
+    "open_circuit_voltage",
+    "r_squared",
+    "mean_current",
+]
+# The to_arrays() columns the fits are computed from
+HEALTH_COLUMNS = ("timestamp", "voltage", "robot_disabled", "pdp_data_currents")
+FLEET_FILENAME = "battery_fleet.csv"
+FLEET_FIELDNAMES = [
+    "battery_id",
+    "logs",
+    "periods",
+    "records",
+    "resistance_mean",
+    "resistance_min",
+    "resistance_max",
+    "resistance_latest",
+    "last_seen",
+]
+UNKNOWN_BATTERY = "Unknown"
+
+# A period needs at least this many records (1 s at 50 Hz) and this much
+# spread in current (variance, A^2) before its slope means anything; an
+# idle robot draws nearly constant current and the fit is just noise.
+MIN_FIT_RECORDS = 50
+MIN_CURRENT_VARIANCE = 4.0
+
+
+class HealthFit(Rollup):
+    """Least-squares voltage/current fit for each enabled period of one log."""
+
+    def __init__(self):
+        super().__init__(ENABLED_TIER)
+        self.periods = EnabledPeriods()
+
+    def add_columns(self, columns: Dict[str, np.ndarray]) -> List[tuple]:
+        """Fold in one piece of to_arrays() columns; return finished fits."""
+        enabled, period = self.periods.split(columns)
+        current = total_current(columns)[enabled]
+        voltage = np.asarray(columns["voltage"][enabled], dtype=np.float64)
+        return self.add(
+            period,
+            columns["timestamp"][enabled],
+            {
+                "current": current,
+                "voltage": voltage,
+                "current_sq": current * current,
+                "cross": current * voltage,
+                "voltage_sq": voltage * voltage,
+            },
+        )
+
+    def _rows(self, buckets: Dict[str, np.ndarray]) -> List[tuple]:
+        n = buckets["records"].astype(np.float64)
+        sum_i = buckets["current_sum"]
+        sum_v = buckets["voltage_sum"]
+        sxx = buckets["current_sq_sum"] - sum_i * sum_i / n
+        sxy = buckets["cross_sum"] - sum_i * sum_v / n
+        syy = buckets["voltage_sq_sum"] - sum_v * sum_v / n
+
+        keep = (n >= MIN_FIT_RECORDS) & (sxx >= MIN_CURRENT_VARIANCE * n)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slope = sxy / sxx
+            r_squared = np.where(syy > 0, sxy * sxy / (sxx * syy), 0.0)
+        open_circuit = (sum_v - slope * sum_i) / n
+
+        columns = [
+            format_nanoseconds(buckets["start"][keep]),
+            format_nanoseconds(buckets["end"][keep]),
+            buckets["records"][keep].tolist(),
+            (-slope[keep]).tolist(),
+            open_circuit[keep].tolist(),
+            r_squared[keep].tolist(),
+            (sum_i / n)[keep].tolist(),
+        ]
+        return list(zip(*columns))
+
+
+def fleet_rows(health: List[tuple]) -> List[tuple]:
+    """Aggregate Manifest.battery_health() rows into one row per battery."""
+    # health rows are (battery_id, log, start, end, records, resistance, ...)
+    by_battery = defaultdict(list)
+    for row in health:
+        by_battery[row[0] or UNKNOWN_BATTERY].append(row)
+
+    rows = []
+    for battery_id, fits in sorted(by_battery.items()):
+        records = np.array([fit[4] for fit in fits], dtype=np.float64)
+        resistance = np.array([fit[5] for fit in fits], dtype=np.float64)
+        latest = max(fits, key=lambda fit: fit[3])
+        rows.append((
+            battery_id,
+            len({fit[1] for fit in fits}),
+            len(fits),
+            int(records.sum()),
+            float(np.average(resistance, weights=records)),
+            float(resistance.min()),
+            float(resistance.max()),
+            latest[5],
+            latest[3],
+        ))
+    return rows
+
+
+def write_fleet(manifest, path: str) -> int:
+    """Rewrite the fleet table at path from the manifest; return its row count."""
+    rows = fleet_rows(manifest.battery_health())
+    part_path = path + ".part"
+    with open(part_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(FLEET_FIELDNAMES)
+        writer.writerows(rows)
+    os.replace(part_path, path)
+    return len(rows)
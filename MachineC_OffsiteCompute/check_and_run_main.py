@@ -1,35 +1,26 @@
 #!/usr/bin/env python3
-"""Wrapper to run main.py only when there are new files in Google Drive.
+"""Wrapper to run the main.py pipeline only when there are new files in Google Drive.
 
-Checks the configured Drive folder for .dslog/.dsevents files and compares
-the names against the local exclusion list used by DSConverter. If any
-Drive file is not yet in the exclusion list, this script runs main.py.
+Asks Drive for .dslog/.dsevents files changed since the last run (the
+changes cursor is kept in the processing manifest) and looks each one up in
+the manifest shared with main.py and DSConverter. If any Drive file is new
+(or changed on Drive since it was processed), the same listing is handed to
+main.run_pipeline in this process, so Drive is not queried twice.
 """
 import os
 import sys
-import subprocess
 from dotenv import load_dotenv
 
 load_dotenv()
 
-ROOT = os.path.dirname(os.path.realpath(__file__))
-EXCLUSION_FP = os.path.join(ROOT, "exclusionListFP.txt")
-
 try:
-    from drive_sync import get_service, get_folder_id_by_name, list_new_files
+    from drive_sync import get_service, get_folder_id_by_name
 except Exception as e:
     print(f"[!] Failed to import drive helpers: {e}")
     sys.exit(1)
 
-
-def read_exclusions(path):
-    if not os.path.exists(path):
-        return set()
-    try:
-        with open(path, "r") as f:
-            return set(line.strip() for line in f if line.strip())
-    except Exception:
-        return set()
+from manifest import Manifest
+from main import commit_cursor, list_pending, run_pipeline
 
 
 def main():
@@ -46,25 +37,21 @@ def main():
         print("[i] Drive folder not found; nothing to do.")
         sys.exit(0)
 
-    files = list_new_files(service, folder_id)
-    if not files:
-        print("[i] No .dslog/.dsevents files found in Drive folder.")
-        sys.exit(0)
-
-    exclusions = read_exclusions(EXCLUSION_FP)
-
-    new_files = [f for f in files if f.get("name") and f.get("name") not in exclusions]
+    manifest = Manifest()
+    new_files, cursor = list_pending(service, manifest, folder_id)
 
     if not new_files:
-        print("[i] No new files to process (all files are in exclusion list).")
+        print("[i] No new files to process (all files are in the manifest).")
+        # Nothing pending, so the cursor can move past whatever changed
+        commit_cursor(manifest, folder_id, new_files, cursor)
         sys.exit(0)
 
-    print(f"[+] Detected {len(new_files)} new file(s). Running main.py...")
-    python = sys.executable or "/usr/bin/python3"
+    print(f"[+] Detected {len(new_files)} new file(s). Running pipeline...")
     try:
-        subprocess.run([python, os.path.join(ROOT, "main.py")], check=False)
+        run_pipeline(service, manifest, new_files)
     except Exception as e:
-        print(f"[!] Failed to run main.py: {e}")
+        print(f"[!] Pipeline failed: {e}")
+    commit_cursor(manifest, folder_id, new_files, cursor)
 
 
 if __name__ == "__main__":
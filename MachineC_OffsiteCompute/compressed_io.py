@@ -0,0 +1,78 @@
+"""Transparent gzip/zstd compression for the offsite pipeline's files (zstd needs `zstandard`)."""
+
+import gzip
+from typing import IO, Optional
+
+# Compression name -> file extension appended to the output name
+COMPRESSION_EXTENSIONS = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+COMPRESSIONS = tuple(COMPRESSION_EXTENSIONS)
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 9
+
+_MAGIC = {b"\x1f\x8b": "gzip", b"\x28\xb5\x2f\xfd": "zstd"}
+
+
+def load_zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise RuntimeError(
+            "zstd compression needs the zstandard package (pip install zstandard)"
+        ) from e
+    return zstandard
+
+
+def with_compression(path: str, compression: str) -> str:
+    """Return path with the extension for compression appended."""
+    return path + COMPRESSION_EXTENSIONS[compression]
+
+
+def strip_compression(path: str) -> str:
+    """Return path without a trailing .gz/.zst extension."""
+    for extension in COMPRESSION_EXTENSIONS.values():
+        if extension and path.endswith(extension):
+            return path[: -len(extension)]
+    return path
+
+
+def compression_from_name(path: str) -> str:
+    """Return the compression implied by path's extension."""
+    for compression, extension in COMPRESSION_EXTENSIONS.items():
+        if extension and path.endswith(extension):
+            return compression
+    return "none"
+
+
+def detect_compression(path: str) -> str:
+    """Return the compression of an existing file, judged by its magic bytes."""
+    with open(path, "rb") as f:
+        head = f.read(4)
+    for magic, compression in _MAGIC.items():
+        if head.startswith(magic):
+            return compression
+    return "none"
+
+
+def open_compressed(path: str, mode: str = "rt", compression: Optional[str] = None, **kwargs) -> IO:
+    """Open path like open(), compressing or decompressing as data streams."""
+    # Without a compression, reads go by the file's magic bytes and writes by
+    # its extension
+    if compression is None:
+        compression = detect_compression(path) if "r" in mode else compression_from_name(path)
+    if compression not in COMPRESSION_EXTENSIONS:
+        raise ValueError(f"Unsupported compression {compression!r}")
+    if "t" not in mode and "b" not in mode:
+        mode += "t"
+
+    if compression == "gzip":
+        if "w" in mode:
+            return gzip.open(path, mode, compresslevel=GZIP_LEVEL, **kwargs)
+        return gzip.open(path, mode, **kwargs)
+    if compression == "zstd":
+        zstandard = load_zstandard()
+        if "w" in mode:
+            cctx = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+            return zstandard.open(path, mode, cctx=cctx, **kwargs)
+        return zstandard.open(path, mode, **kwargs)
+    return open(path, mode, **kwargs)
@@ -1,8 +1,15 @@
 
 from __future__ import print_function
-import os, io, time
+import os, time
+import hashlib
+import random
+import socket
+import threading
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaIoBaseDownload, build_http
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 import pickle
@@ -12,6 +19,18 @@ load_dotenv()
 
 SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
 
+# Download tuning (all overridable from .env)
+DOWNLOAD_CHUNK_SIZE = int(os.getenv('DRIVE_CHUNK_SIZE', 8 * 1024 * 1024))  # bytes per request
+DOWNLOAD_WORKERS = int(os.getenv('DRIVE_DOWNLOAD_WORKERS', 4))
+DOWNLOAD_RETRIES = int(os.getenv('DRIVE_DOWNLOAD_RETRIES', 5))
+RETRY_BACKOFF = float(os.getenv('DRIVE_RETRY_BACKOFF', 1.0))  # seconds, doubled per attempt
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# Transport failures worth another attempt; anything else (bad credentials,
+# a full disk, a bug) fails straight away
+TRANSPORT_ERRORS = (ConnectionError, socket.timeout, httplib2.HttpLib2Error)
+
+_thread_state = threading.local()
+
 def get_service():
     creds = None
     # Load sensitive paths from .env
@@ -60,23 +79,212 @@ def get_folder_id_by_name(service, folder_name):
         print(f"[!] Error resolving folder name '{folder_name}': {e}")
         return None
 
+LOG_EXTENSIONS = ('.dslog', '.dsevents')
+LIST_PAGE_SIZE = 1000
+
+def _is_log_file(file):
+    return file.get('name', '').endswith(LOG_EXTENSIONS) and not file.get('trashed')
+
 def list_new_files(service, folder_id):
-    results = service.files().list(
-        q=f"'{folder_id}' in parents and (name contains '.dslog' or name contains '.dsevents')",
-        spaces='drive',
-        fields='files(id, name, modifiedTime)',
-    ).execute()
-    return results.get('files', [])
-
-def download_file(service, file_id, dest_path):
-    request = service.files().get_media(fileId=file_id)
-    with io.FileIO(dest_path, 'wb') as fh:
-        downloader = MediaIoBaseDownload(fh, request)
-        done = False
-        while not done:
-            status, done = downloader.next_chunk()
+    """List every .dslog/.dsevents file in folder_id, following all result pages."""
+    files = []
+    page_token = None
+    while True:
+        results = service.files().list(
+            q=f"'{folder_id}' in parents and (name contains '.dslog' or name contains '.dsevents')"
+            " and trashed = false",
+            spaces='drive',
+            fields='nextPageToken, files(id, name, modifiedTime, size, md5Checksum)',
+            pageSize=LIST_PAGE_SIZE,
+            pageToken=page_token,
+        ).execute()
+        files.extend(f for f in results.get('files', []) if _is_log_file(f))
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            return files
+
+def list_changed_files(service, folder_id, cursor=None):
+    """Return (files, next cursor): log files in folder_id changed since cursor."""
+    # The changes API rather than a modifiedTime watermark, since Drive
+    # desktop sync keeps the original modifiedTime of late uploads. Store the
+    # new cursor only once the files are handled.
+    if cursor is None:
+        # Take the token before listing so nothing uploaded meanwhile is missed
+        start = service.changes().getStartPageToken().execute()['startPageToken']
+        return list_new_files(service, folder_id), start
+
+    files = {}
+    page_token = cursor
+    while True:
+        results = service.changes().list(
+            pageToken=page_token,
+            spaces='drive',
+            fields='nextPageToken, newStartPageToken,'
+            ' changes(fileId, removed,'
+            ' file(id, name, modifiedTime, size, md5Checksum, parents, trashed))',
+            pageSize=LIST_PAGE_SIZE,
+        ).execute()
+        for change in results.get('changes', []):
+            file = change.get('file')
+            if change.get('removed') or not file:
+                files.pop(change.get('fileId'), None)
+                continue
+            if folder_id in file.get('parents', []) and _is_log_file(file):
+                files[file['id']] = {
+                    key: file[key]
+                    for key in ('id', 'name', 'modifiedTime', 'size', 'md5Checksum')
+                    if key in file
+                }
+            else:
+                files.pop(file['id'], None)
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            return list(files.values()), results.get('newStartPageToken', cursor)
+
+def worker_http(service):
+    """Return this thread's own authorized HTTP object for service, or None without credentials."""
+    # httplib2 connections are not thread-safe
+    http = getattr(_thread_state, 'http', None)
+    if http is None:
+        credentials = getattr(getattr(service, '_http', None), 'credentials', None)
+        if credentials is None:
+            return None
+        http = AuthorizedHttp(credentials, http=build_http())
+        _thread_state.http = http
+    return http
+
+class ChecksumMismatch(IOError):
+    """A finished download doesn't match the md5Checksum Drive reported."""
+
+def _is_retryable(error):
+    if isinstance(error, HttpError):
+        return error.resp.status in RETRYABLE_STATUS
+    # A bad checksum has already discarded the .part, so a retry starts clean
+    return isinstance(error, TRANSPORT_ERRORS + (ChecksumMismatch,))
+
+def _md5(path, chunk_size=1 << 20):
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _total_size(resp):
+    # Full size of the file from a 200/206/416 response, if it says
+    if 'content-range' in resp:
+        length = resp['content-range'].rsplit('/', 1)[1]
+        return int(length) if length != '*' else None
+    if resp.status == 200 and 'content-length' in resp:
+        return int(resp['content-length'])
+    return None
+
+def _resume_offset(part_path, size, revision):
+    # Bytes of part_path that can be kept. The Drive revision the .part was
+    # started from is stored next to it in part_path + '.rev'; a .part from
+    # another revision (or longer than the file) is thrown away.
+    rev_path = part_path + '.rev'
+    stored = None
+    if os.path.exists(rev_path):
+        with open(rev_path) as f:
+            stored = f.read() or None
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    if offset and (stored != revision or (size is not None and offset > size)):
+        os.remove(part_path)
+        offset = 0
+    if stored != revision:
+        if revision is None:
+            os.remove(rev_path)
+        else:
+            with open(rev_path, 'w') as f:
+                f.write(revision)
+    return offset
+
+def _download_part(service, file_id, part_path, chunk_size, http, size, revision):
+    offset = _resume_offset(part_path, size, revision)
+    with open(part_path, 'ab') as fh:
+        if size is not None and offset == size:
+            return
+        request = service.files().get_media(fileId=file_id)
+        if http is None:
+            http = request.http
+        headers = dict(request.headers)
+        while True:
+            # Continue after the bytes already on disk
+            headers['range'] = f'bytes={offset}-{offset + chunk_size - 1}'
+            resp, content = http.request(request.uri, 'GET', headers=headers)
+            if resp.status == 416 and _total_size(resp) == offset:
+                # Range Not Satisfiable: the .part file already holds everything
+                return
+            if resp.status not in (200, 206):
+                raise HttpError(resp, content, uri=request.uri)
+            if resp.status == 200 and offset:
+                # The server ignored the range and sent the whole file
+                fh.truncate(0)
+                offset = 0
+            fh.write(content)
+            offset += len(content)
+            total = _total_size(resp)
+            if total is None or offset >= total:
+                return
+
+def download_file(service, file_id, dest_path, chunk_size=DOWNLOAD_CHUNK_SIZE,
+                  http=None, size=None, revision=None, md5=None, retries=DOWNLOAD_RETRIES):
+    """Download a Drive file to dest_path, resuming and retrying as needed."""
+    # Chunks go to dest_path.part, which a later attempt resumes while the
+    # revision matches; only a complete, md5-checked file is renamed into place
+    part_path = dest_path + '.part'
+    for attempt in range(retries + 1):
+        try:
+            _download_part(service, file_id, part_path, chunk_size, http, size, revision)
+            if md5 is not None and _md5(part_path) != md5:
+                os.remove(part_path)
+                raise ChecksumMismatch(f"md5 mismatch downloading {file_id} to {dest_path}")
+            break
+        except Exception as e:
+            if attempt == retries or not _is_retryable(e):
+                raise
+            _backoff(file_id, attempt, e)
+    os.replace(part_path, dest_path)
+    if os.path.exists(part_path + '.rev'):
+        os.remove(part_path + '.rev')
     return dest_path
 
+def _backoff(file_id, attempt, error):
+    delay = RETRY_BACKOFF * 2 ** attempt + random.uniform(0, RETRY_BACKOFF)
+    print(f"[!] Download of {file_id} failed ({error}); retrying in {delay:.1f}s")
+    time.sleep(delay)
+
+def stream_file(service, file_id, open_sink, chunk_size=DOWNLOAD_CHUNK_SIZE,
+                http=None, retries=DOWNLOAD_RETRIES):
+    """Download a Drive file chunk by chunk into a sink from open_sink(); return that sink."""
+    # A stream can't resume, so a retry aborts the sink and starts a fresh one
+    for attempt in range(retries + 1):
+        sink = open_sink()
+        try:
+            request = service.files().get_media(fileId=file_id)
+            if http is not None:
+                request.http = http
+            downloader = MediaIoBaseDownload(sink, request, chunksize=chunk_size)
+            done = False
+            while not done:
+                status, done = downloader.next_chunk()
+            return sink
+        except Exception as e:
+            if hasattr(sink, 'abort'):
+                sink.abort()
+            if attempt == retries or not _is_retryable(e):
+                raise
+            _backoff(file_id, attempt, e)
+
+def file_size(file):
+    """Size in bytes from a files().list entry (Drive returns it as a string)."""
+    size = file.get('size')
+    return int(size) if size is not None else None
+
+def file_revision(file):
+    """What identifies this version of a files().list entry's content."""
+    return file.get('md5Checksum') or file.get('modifiedTime')
+
 # --- TEST BLOCK ---
 if __name__ == "__main__":
     print("[TEST] Authenticating with Google Drive...")
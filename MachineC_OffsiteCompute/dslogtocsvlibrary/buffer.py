@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+import io
+import mmap
+from typing import BinaryIO, Union
+
+Source = Union[BinaryIO, bytes, bytearray, memoryview, mmap.mmap]
+
+
+def open_buffer(source: Source) -> memoryview:
+    if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+        return memoryview(source).cast("B")
+    try:
+        fileno = source.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return memoryview(source.read())
+    position = source.tell()
+    try:
+        mapped = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        # Empty files and pipes cannot be mapped; fall back to one read.
+        return memoryview(source.read())
+    return memoryview(mapped)[position:]
@@ -1,32 +1,33 @@
-from io import BufferedReader
-from typing import Generator, Optional
+from typing import Generator
 
+from .buffer import Source, open_buffer
 from .entry.event_entry import EventEntry
 from .entry.metadata import Metadata
 
 
 class DsEventStream:
-    def __init__(self, file: BufferedReader) -> None:
+    def __init__(self, file: Source) -> None:
         self.file = file
-        self.metadata = Metadata.from_bytes(self.file.read(Metadata.length()))
+        self.buffer = open_buffer(file)
+        self.metadata = Metadata.from_buffer(self.buffer)
         if self.metadata.version != 4:
             raise ValueError(f"Unsupported log version {self.metadata.version}")
+        self.data_start = Metadata.length()
 
     def __iter__(self) -> Generator[EventEntry, None, None]:
         self.start_time = self.metadata.date
+        buffer = self.buffer
+        size = len(buffer)
+        position = self.data_start
+        entry_length = EventEntry.length()
         while True:
-            if data := self.conditional_read(EventEntry.length()):
-                entry = EventEntry.from_bytes(data)
-            else:
+            if position + entry_length > size:
                 break
-            if data := self.conditional_read(entry.message_length):
-                entry.parse_message(data)
-            else:
+            entry = EventEntry.from_buffer(buffer, position)
+            position += entry_length
+            end = position + entry.message_length
+            if entry.message_length <= 0 or end > size:
                 break
+            entry.parse_message(buffer[position:end])
+            position = end
             yield entry
-
-    def conditional_read(self, expected_size: int) -> Optional[bytes]:
-        data = self.file.read(expected_size)
-        if len(data) != expected_size:
-            return None
-        return data
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from .dslogstream import DsLogStream
+from .entry.generic_entry import BufferLike
+from .entry.metadata import Metadata
+
+
+class DsLogFeed:
+    def __init__(self) -> None:
+        self._header: Optional[bytes] = None
+        self._pending = bytearray()
+        self.size = 0
+        self.records = 0
+
+    def write(self, data: BufferLike) -> int:
+        self._pending += data
+        self.size += len(data)
+        return len(data)
+
+    def read(self) -> Optional[DsLogStream]:
+        if self._header is None:
+            if len(self._pending) < Metadata.length():
+                return None
+            self._header = bytes(self._pending[: Metadata.length()])
+            del self._pending[: Metadata.length()]
+        # The stream gets its own copy, so the pending buffer can keep growing
+        # while the caller still holds on to earlier pieces.
+        stream = DsLogStream(self._header + self._pending, first_index=self.records)
+        count = len(stream)
+        if count == 0:
+            return None
+        del self._pending[: stream.data_end - stream.data_start]
+        self.records += count
+        return stream
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def close(self) -> Optional[DsLogStream]:
+        if self._header is None:
+            # Too short to hold the metadata; DsLogStream raises the same
+            # error it would for such a file on disk.
+            DsLogStream(bytes(self._pending))
+        return self.read()
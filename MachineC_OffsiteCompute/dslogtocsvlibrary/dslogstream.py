@@ -1,55 +1,319 @@
-from datetime import timedelta
-from io import BufferedReader
-from typing import Generator, Optional, Type, cast
+import math
+from array import array
+from datetime import datetime, timedelta
+from typing import Collection, Generator, Optional, Type, Union, overload
 
+import numpy as np
+
+from .buffer import Source, open_buffer
 from .entry.log_entry import LogEntry
 from .entry.metadata import Metadata
 from .entry.pdp_ctre_data import PdpCtreData
 from .entry.pdp_data import PdpData
 from .entry.pdp_meta_data import PdpMetaData
 from .entry.pdp_rev_pdh_data import PdpRevPdhData
+from .entry.parse_date import to_nanoseconds
 from .entry.pdp_type import PdpType
+from .entry.status_entry import StatusEntry
+from .record_index import RecordIndex
+
+# Columns that need the PDP payload decoded
+PDP_COLUMNS = (
+    "pdp_data_pdp_id",
+    "pdp_data_currents",
+    "pdp_data_voltage",
+    "pdp_data_resistance",
+    "pdp_data_temperature",
+)
+# Every column to_arrays() can return, in the order it returns them
+COLUMNS = (
+    ("timestamp",)
+    + LogEntry.dtype.names
+    + StatusEntry.__slots__
+    + ("pdp_type",)
+    + PDP_COLUMNS
+)
 
 
 class DsLogStream:
-    def __init__(self, file: BufferedReader) -> None:
+    def __init__(
+        self,
+        file: Source,
+        first_index: int = 0,
+        columns: Optional[Collection[str]] = None,
+    ) -> None:
         self.file = file
-        self.metadata = Metadata.from_bytes(self.file.read(Metadata.length()))
+        self.buffer = open_buffer(file)
+        self.metadata = Metadata.from_buffer(self.buffer)
         if self.metadata.version != 4:
             raise ValueError(f"Unsupported log version {self.metadata.version}")
+        self.data_start = Metadata.length()
         self.pdp_map: dict[PdpType, Optional[Type[PdpData]]] = {
             PdpType.NONE: None,
             PdpType.CTRE: PdpCtreData,
             PdpType.REV: PdpRevPdhData,
         }
         self.entry_distance_s = 0.02
+        self.start_time = self.metadata.date
+        self.start_ns = to_nanoseconds(self.start_time)
+        # Position of this buffer's first record within the whole log, for
+        # streams over a later piece of it (see DsLogFeed)
+        self.first_index = first_index
+        # Default projection for to_arrays() and iteration; None means all
+        self.columns = self._check_columns(columns)
+        self._header_length = LogEntry.length() + PdpMetaData.length()
+        self._index: Optional[RecordIndex] = None
+        self._channels: Optional[int] = None
 
     def __iter__(self) -> Generator[LogEntry, None, None]:
-        self.start_time = self.metadata.date
+        position = self.data_start
         index = 0
-        while True:
-            time = self.start_time + timedelta(seconds=self.entry_distance_s * index)
+        while (end := self._record_end(position)) is not None:
+            yield self._entry_at(position, index)
+            position = end
             index += 1
-            if data := self.conditional_read(LogEntry.length()):
-                entry = LogEntry.from_bytes(data)
-            else:
-                break
-            entry.date = time
-            if data := self.conditional_read(PdpMetaData.length()):
-                entry.pdp_meta_data = PdpMetaData.from_bytes(data)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @overload
+    def __getitem__(self, key: int) -> LogEntry: ...
+
+    @overload
+    def __getitem__(self, key: slice) -> list[LogEntry]: ...
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[LogEntry, list[LogEntry]]:
+        index = self.index
+        if isinstance(key, slice):
+            return [self._entry_at(index.offset(i), i) for i in range(*key.indices(len(index)))]
+        if key < 0:
+            key += len(index)
+        if not 0 <= key < len(index):
+            raise IndexError("DsLogStream index out of range")
+        return self._entry_at(index.offset(key), key)
+
+    def between(self, start: datetime, end: datetime) -> list[LogEntry]:
+        window = self.time_range(start, end)
+        return self[window.start : window.stop]
+
+    def time_range(self, start: datetime, end: datetime) -> range:
+        first = self._index_at_or_after(start)
+        return range(first, max(first, self._index_at_or_after(end)))
+
+    @property
+    def index(self) -> RecordIndex:
+        if self._index is None:
+            self._index = self._build_index()
+        return self._index
+
+    @property
+    def channels(self) -> int:
+        if self._channels is None:
+            if self.index.is_fixed:
+                types = self.pdp_types(0, 1)
             else:
-                break
-            pdp_class = self.pdp_map[entry.pdp_meta_data.type]
-            if pdp_class is not None:
-                if data := self.conditional_read(pdp_class.length()):
-                    pdp_data = cast(PdpData, pdp_class.from_bytes(data))
-                else:
-                    break
-                entry.pdp_data = pdp_data
-            yield entry
-
-    def conditional_read(self, expected_size: int) -> Optional[bytes]:
-        data = self.file.read(expected_size)
-        if len(data) != expected_size:
+                types = np.unique(self.pdp_types())
+            self._channels = max(
+                (self._pdp_channels(PdpType(int(value))) for value in types), default=0
+            )
+        return self._channels
+
+    @property
+    def data_end(self) -> int:
+        count = len(self.index)
+        if count == 0:
+            return self.data_start
+        return self._record_end(self.index.offset(count - 1))
+
+    def pdp_types(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        start, stop = self._bounds(start, stop)
+        buffer = np.frombuffer(self.buffer, dtype=np.uint8)
+        return buffer[self.index.to_array(start, stop) + self._header_length - 1]
+
+    def timestamps(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        start, stop = self._bounds(start, stop)
+        elapsed = self.entry_distance_s * np.arange(
+            self.first_index + start, self.first_index + stop, dtype=np.float64
+        )
+        # Round to the microsecond exactly as timedelta(seconds=...) does in
+        # _date_at, so the column and the per-record dates agree.
+        whole = np.trunc(elapsed)
+        micros = whole.astype(np.int64) * 1_000_000 + np.round(
+            (elapsed - whole) * 1e6
+        ).astype(np.int64)
+        return self.start_ns + micros * 1000
+
+    def to_arrays(
+        self,
+        start: int = 0,
+        stop: Optional[int] = None,
+        columns: Optional[Collection[str]] = None,
+    ) -> dict[str, np.ndarray]:
+        wanted = self.columns if columns is None else self._check_columns(columns)
+        start, stop = self._bounds(start, stop)
+        buffer = np.frombuffer(self.buffer, dtype=np.uint8)
+        offsets = self.index.to_array(start, stop)
+        count = len(offsets)
+        # Header fields that are not needed are pad bytes in the dtype, so
+        # they are never converted
+        dtype = LogEntry.dtype
+        if wanted is not None:
+            _, dtype = LogEntry.projection(LogEntry.fields_for(wanted))
+        if self.index.is_fixed and count:
+            # Every record has the same PDP type, so the headers can be read
+            # in place as a strided view of the file.
+            records = np.ndarray(
+                shape=(count,),
+                dtype=dtype,
+                buffer=buffer,
+                offset=int(offsets[0]),
+                strides=(self.index.stride,),
+            )
+        else:
+            gather = offsets[:, np.newaxis] + np.arange(LogEntry.length())
+            records = buffer[gather].view(dtype)[:, 0]
+        if wanted is None:
+            types = self.pdp_types(start, stop)
+            arrays = {"timestamp": self.timestamps(start, stop)}
+            arrays.update(LogEntry.from_array(records))
+            arrays["pdp_type"] = types
+            arrays.update(self._pdp_arrays(buffer, offsets, types))
+            return arrays
+
+        arrays = {}
+        if "timestamp" in wanted:
+            arrays["timestamp"] = self.timestamps(start, stop)
+        arrays.update(LogEntry.from_array(records, wanted))
+        pdp_columns = wanted.intersection(PDP_COLUMNS)
+        if "pdp_type" in wanted or pdp_columns:
+            types = self.pdp_types(start, stop)
+            if "pdp_type" in wanted:
+                arrays["pdp_type"] = types
+            # The PDP payloads are only decoded when one of their fields is asked for
+            if pdp_columns:
+                arrays.update(self._pdp_arrays(buffer, offsets, types, pdp_columns))
+        return {name: arrays[name] for name in COLUMNS if name in arrays}
+
+    def _bounds(self, start: int, stop: Optional[int]) -> tuple[int, int]:
+        start, stop, _ = slice(start, stop).indices(len(self.index))
+        return start, max(start, stop)
+
+    def _check_columns(self, columns: Optional[Collection[str]]) -> Optional[frozenset]:
+        if columns is None:
             return None
-        return data
+        columns = frozenset(columns)
+        unknown = columns.difference(COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown columns {sorted(unknown)}")
+        return columns
+
+    def _pdp_arrays(
+        self,
+        buffer: np.ndarray,
+        offsets: np.ndarray,
+        types: np.ndarray,
+        wanted: Collection[str] = PDP_COLUMNS,
+    ) -> dict[str, np.ndarray]:
+        count = len(offsets)
+        present = [
+            (pdp_type, pdp_class)
+            for pdp_type, pdp_class in self.pdp_map.items()
+            if pdp_class is not None and np.any(types == pdp_type.value)
+        ]
+        # The currents matrix is as wide as the widest PDP anywhere in the
+        # file, so every window has the same shape. Channels a record's PDP
+        # does not have are NaN; records without a PDP keep the PdpData
+        # defaults for the scalar fields.
+        columns = {
+            "pdp_data_pdp_id": np.zeros(count, dtype=np.uint8),
+            "pdp_data_currents": np.full((count, self.channels), np.nan, dtype=np.float32),
+            "pdp_data_voltage": np.zeros(count, dtype=np.float64),
+            "pdp_data_resistance": np.zeros(count, dtype=np.float64),
+            "pdp_data_temperature": np.zeros(count, dtype=np.float64),
+        }
+        columns = {name: values for name, values in columns.items() if name in wanted}
+        for pdp_type, pdp_class in present:
+            mask = types == pdp_type.value
+            gather = (offsets[mask] + self._header_length)[:, np.newaxis] + np.arange(
+                pdp_class.length()
+            )
+            decoded = pdp_class.from_array(buffer[gather])
+            if "pdp_data_currents" in columns:
+                columns["pdp_data_currents"][mask, : pdp_class.channels] = decoded["currents"]
+            for name in ("pdp_id", "voltage", "resistance", "temperature"):
+                if f"pdp_data_{name}" in columns:
+                    columns[f"pdp_data_{name}"][mask] = decoded[name]
+        return columns
+
+    def _build_index(self) -> RecordIndex:
+        data = self.buffer
+        start = self.data_start
+        size = len(data) - start
+        type_index = self._header_length - 1
+        if size >= self._header_length:
+            first = PdpType(data[start + type_index])
+            stride = self._record_length(first)
+            count = size // stride
+            types = np.frombuffer(data, dtype=np.uint8)[start + type_index :: stride][:count]
+            # A tail long enough to hold another header may still be a complete
+            # record of a shorter PDP type, so only trust the fixed stride
+            # when nothing else could follow.
+            if np.all(types == first.value) and self._record_end(start + count * stride) is None:
+                return RecordIndex.fixed(start, count, stride)
+        offsets = array("Q")
+        position = start
+        while (end := self._record_end(position)) is not None:
+            offsets.append(position)
+            position = end
+        return RecordIndex.from_offsets(offsets)
+
+    def _record_end(self, position: int) -> Optional[int]:
+        if position + self._header_length > len(self.buffer):
+            return None
+        end = position + self._record_length(
+            PdpType(self.buffer[position + self._header_length - 1])
+        )
+        return end if end <= len(self.buffer) else None
+
+    def _pdp_channels(self, pdp_type: PdpType) -> int:
+        pdp_class = self.pdp_map[pdp_type]
+        return pdp_class.channels if pdp_class is not None else 0
+
+    def _record_length(self, pdp_type: PdpType) -> int:
+        pdp_class = self.pdp_map[pdp_type]
+        pdp_length = pdp_class.length() if pdp_class is not None else 0
+        return self._header_length + pdp_length
+
+    def _entry_at(self, position: int, index: int) -> LogEntry:
+        wanted = self.columns
+        if wanted is None:
+            entry = LogEntry.from_buffer(self.buffer, position)
+        else:
+            entry = LogEntry.from_buffer(self.buffer, position, LogEntry.fields_for(wanted))
+        if wanted is None or "timestamp" in wanted:
+            entry.date = self._date_at(index)
+        position += LogEntry.length()
+        entry.pdp_meta_data = PdpMetaData.from_buffer(self.buffer, position)
+        pdp_class = self.pdp_map[entry.pdp_meta_data.type]
+        if pdp_class is not None and (wanted is None or wanted.intersection(PDP_COLUMNS)):
+            entry.pdp_data = pdp_class.from_buffer(self.buffer, position + PdpMetaData.length())
+        return entry
+
+    def _index_at_or_after(self, when: datetime) -> int:
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=self.start_time.tzinfo)
+        count = len(self)
+        elapsed = (when - self.start_time).total_seconds()
+        index = min(max(math.ceil(elapsed / self.entry_distance_s), 0), count)
+        # Record dates are rounded to the microsecond, so settle the estimate
+        # on the exact boundary rather than trusting the division.
+        while index > 0 and self._date_at(index - 1) >= when:
+            index -= 1
+        while index < count and self._date_at(index) < when:
+            index += 1
+        return index
+
+    def _date_at(self, index: int) -> datetime:
+        return self.start_time + timedelta(
+            seconds=self.entry_distance_s * (self.first_index + index)
+        )
@@ -5,13 +5,21 @@ import struct
 from datetime import datetime
 from typing import Optional
 
-from .generic_entry import GenericEntry
+from .generic_entry import BufferLike, GenericEntry
 from .parse_date import parse_date
 
 
 class EventEntry(GenericEntry):
+    # The message is kept as raw bytes (a zero-copy slice of the stream's
+    # buffer) and only split into its <tag> value dict when .message is
+    # first read, so scans that look at times or counts never pay for it.
+    __slots__ = ("unix_time", "offset", "message_length", "raw_message", "_message")
+
     byte_code = ">qQi"
-    message_pattern = r"<\w*>"
+    # A <tag>; the group captures its name
+    message_pattern = r"<(\w*)>"
+    _struct = struct.Struct(byte_code)
+    _tag_split = re.compile(message_pattern)
 
     def __init__(
         self,
@@ -23,44 +31,58 @@ class EventEntry(GenericEntry):
         self.unix_time = unix_time
         self.offset = offset
         self.message_length = message_length
-        self.message = message if message else {}
+        self.raw_message: BufferLike = b""
+        self._message = message if message else {}
         super().__init__()
 
     @classmethod
     def from_bytes(cls, data: bytes) -> EventEntry:
-        unix_time, offset, length = struct.unpack(cls.byte_code, data)
-        return cls(unix_time, offset, length)
+        return cls.from_buffer(data)
+
+    @classmethod
+    def from_buffer(cls, buffer: BufferLike, offset: int = 0) -> EventEntry:
+        unix_time, date_offset, length = cls._struct.unpack_from(buffer, offset)
+        return cls(unix_time, date_offset, length)
+
+    def parse_message(self, data: BufferLike) -> None:
+        self.raw_message = data[: self.message_length]
+        self._message = None
+
+    @property
+    def text(self) -> str:
+        return str(self.raw_message, "ascii", "backslashreplace")
 
-    def parse_message(self, data: bytes) -> None:
-        text = struct.unpack(f">{self.message_length}s", data)[0].decode(
-            "ascii", "backslashreplace"
-        )
-        self.message = text
-        matches: list[re.Match] = list(re.finditer(self.message_pattern, text))
+    @property
+    def message(self) -> dict:
+        if self._message is None:
+            self._message = self._parse(self.text)
+        return self._message
+
+    @message.setter
+    def message(self, message: dict) -> None:
+        self._message = message
+
+    @classmethod
+    def _parse(cls, text: str) -> dict:
+        # split() gives [before, tag, value, tag, value, ...]. Each value
+        # drops the separator after its tag and the one character before the
+        # next tag (or the end of the message); TagVersion has no separator.
+        parts = cls._tag_split.split(text)
         message = {}
-        for index in range(len(matches)):
-            match = matches[index]
-            key = text[match.start() + 1 : match.end() - 1]
-            if index == len(matches) - 1:
-                value_stop = len(text) - 1
-            else:
-                next_match = matches[index + 1]
-                value_stop = next_match.start() - 1
-            value_start = match.end() + 1
-            is_version = key == "TagVersion"
-            if is_version:
-                value_start -= 1
-            value = text[value_start:value_stop]
-            if is_version:
-                value = int(value)
+        for index in range(1, len(parts), 2):
+            key = parts[index]
+            if key == "TagVersion":
+                value = int(parts[index + 1][:-1])
                 if value != 1:
                     raise ValueError(f"Unsupported version {value}")
+            else:
+                value = parts[index + 1][1:-1]
             message[key] = value
-        self.message = message
+        return message
 
     @classmethod
     def length(cls) -> int:
-        return struct.calcsize(cls.byte_code)
+        return cls._struct.size
 
     @property
     def date(self) -> datetime:
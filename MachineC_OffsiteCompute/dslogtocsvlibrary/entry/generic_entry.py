@@ -1,14 +1,23 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+from typing import Union
+
+BufferLike = Union[bytes, bytearray, memoryview]
 
 
 class GenericEntry(ABC):
+    __slots__ = ()
+
     @classmethod
     @abstractmethod
     def from_bytes(cls, data: bytes) -> GenericEntry:
         pass
 
+    @classmethod
+    def from_buffer(cls, buffer: BufferLike, offset: int = 0) -> GenericEntry:
+        return cls.from_bytes(bytes(buffer[offset : offset + cls.length()]))
+
     @classmethod
     @abstractmethod
     def length(cls) -> int:
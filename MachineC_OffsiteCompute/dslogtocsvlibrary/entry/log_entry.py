@@ -2,9 +2,11 @@ from __future__ import annotations
 
 import struct
 from datetime import datetime
-from typing import Optional
+from typing import Collection, Optional
 
-from .generic_entry import GenericEntry
+import numpy as np
+
+from .generic_entry import BufferLike, GenericEntry
 from .pdp_data import PdpData
 from .pdp_meta_data import PdpMetaData
 from .pdp_type import PdpType
@@ -12,7 +14,48 @@ from .status_entry import StatusEntry
 
 
 class LogEntry(GenericEntry):
+    __slots__ = (
+        "trip_time",
+        "packet_loss",
+        "voltage",
+        "rio",
+        "status",
+        "can",
+        "wifi",
+        "bandwidth",
+        "pdp_id",
+        "date",
+        "pdp_meta_data",
+        "pdp_data",
+    )
     byte_code = ">BbHBBBBHB"
+    dtype = np.dtype(
+        [
+            ("trip_time", "u1"),
+            ("packet_loss", "i1"),
+            ("voltage", ">u2"),
+            ("rio", "u1"),
+            ("status", "u1"),
+            ("can", "u1"),
+            ("wifi", "u1"),
+            ("bandwidth", ">u2"),
+            ("pdp_id", "u1"),
+        ]
+    )
+    _struct = struct.Struct(byte_code)
+    # struct codes of the header fields, in file order
+    _codes = (
+        ("trip_time", "B"),
+        ("packet_loss", "b"),
+        ("voltage", "H"),
+        ("rio", "B"),
+        ("status", "B"),
+        ("can", "B"),
+        ("wifi", "B"),
+        ("bandwidth", "H"),
+        ("pdp_id", "B"),
+    )
+    _projections: dict[frozenset, tuple[struct.Struct, np.dtype]] = {}
 
     def __init__(
         self,
@@ -26,7 +69,7 @@ class LogEntry(GenericEntry):
         bandwidth: float,
         pdp_id: int,
         date: datetime = datetime(1904, 1, 1, 0, 0, 0),
-        pdp_meta_data: PdpMetaData = PdpMetaData(PdpType.NONE),
+        pdp_meta_data: PdpMetaData = PdpMetaData.from_type(PdpType.NONE),
         pdp_data: PdpData = PdpData(),
     ) -> None:
         self.trip_time = trip_time
@@ -44,6 +87,45 @@ class LogEntry(GenericEntry):
 
     @classmethod
     def from_bytes(cls, data: bytes) -> LogEntry:
+        return cls.from_buffer(data)
+
+    @classmethod
+    def fields_for(cls, columns: Optional[Collection[str]]) -> tuple[str, ...]:
+        # Header fields needed to produce the given to_arrays() columns; the
+        # status bit columns all come from the status byte.
+        if columns is None:
+            return cls.dtype.names
+        wanted = set(columns)
+        if wanted.intersection(StatusEntry.__slots__):
+            wanted.add("status")
+        return tuple(name for name in cls.dtype.names if name in wanted)
+
+    @classmethod
+    def projection(cls, fields: Collection[str]) -> tuple[struct.Struct, np.dtype]:
+        # A struct and a numpy dtype that read only the given header fields;
+        # the bytes of every other field become pad bytes and are skipped.
+        key = frozenset(fields)
+        if key not in cls._projections:
+            code = ">" + "".join(
+                code if name in key else "x" * struct.calcsize(code) for name, code in cls._codes
+            )
+            dtype = np.dtype(
+                {
+                    "names": [name for name in cls.dtype.names if name in key],
+                    "formats": [cls.dtype.fields[name][0] for name in cls.dtype.names if name in key],
+                    "offsets": [cls.dtype.fields[name][1] for name in cls.dtype.names if name in key],
+                    "itemsize": cls.dtype.itemsize,
+                }
+            )
+            cls._projections[key] = (struct.Struct(code), dtype)
+        return cls._projections[key]
+
+    @classmethod
+    def from_buffer(
+        cls, buffer: BufferLike, offset: int = 0, fields: Optional[Collection[str]] = None
+    ) -> LogEntry:
+        if fields is not None and len(fields) < len(cls._codes):
+            return cls._from_projection(buffer, offset, fields)
         (
             trip_time,
             packet_loss,
@@ -54,7 +136,7 @@ class LogEntry(GenericEntry):
             wifi,
             bandwidth,
             pdp_id,
-        ) = struct.unpack(cls.byte_code, data)
+        ) = cls._struct.unpack_from(buffer, offset)
         return cls(
             trip_time=cls._trip_time_to_double(trip_time),
             packet_loss=cls._packet_loss_to_double(packet_loss),
@@ -67,6 +149,81 @@ class LogEntry(GenericEntry):
             pdp_id=pdp_id,
         )
 
+    @classmethod
+    def _from_projection(cls, buffer: BufferLike, offset: int, fields: Collection[str]) -> LogEntry:
+        # Fields that were not requested are left as None
+        unpack, _ = cls.projection(fields)
+        names = [name for name in cls.dtype.names if name in fields]
+        values = dict.fromkeys(cls.dtype.names)
+        values.update(zip(names, unpack.unpack_from(buffer, offset)))
+        return cls(
+            trip_time=cls._scaled(cls._trip_time_to_double, values["trip_time"]),
+            packet_loss=cls._scaled(cls._packet_loss_to_double, values["packet_loss"]),
+            voltage=cls._scaled(cls._voltage_to_double, values["voltage"]),
+            rio=cls._scaled(cls._roborio_cpu_to_double, values["rio"]),
+            status=cls._scaled(StatusEntry.from_int, values["status"]),
+            can=cls._scaled(cls._can_util_to_double, values["can"]),
+            wifi=cls._scaled(cls._wifi_db_to_double, values["wifi"]),
+            bandwidth=cls._scaled(cls._bandwidth_to_double, values["bandwidth"]),
+            pdp_id=values["pdp_id"],
+        )
+
+    @staticmethod
+    def _scaled(convert, value):
+        return None if value is None else convert(value)
+
+    @classmethod
+    def from_array(
+        cls, records: np.ndarray, columns: Optional[Collection[str]] = None
+    ) -> dict[str, np.ndarray]:
+        if columns is not None:
+            return cls._from_projected_array(records, columns)
+        # Widen to float64 first so the scale factors below see the same
+        # values (and overflow the same way) as the scalar path.
+        columns = {
+            "trip_time": cls._trip_time_to_double(records["trip_time"].astype(np.float64)),
+            "packet_loss": cls._packet_loss_to_double(
+                records["packet_loss"].astype(np.float64)
+            ),
+            "voltage": cls._voltage_to_double(records["voltage"].astype(np.float64)),
+            "rio": cls._roborio_cpu_to_double(records["rio"].astype(np.float64)),
+            "status": records["status"].astype(np.uint8),
+            "can": cls._can_util_to_double(records["can"].astype(np.float64)),
+            "wifi": cls._wifi_db_to_double(records["wifi"].astype(np.float64)),
+            "bandwidth": cls._bandwidth_to_double(records["bandwidth"].astype(np.float64)),
+            "pdp_id": records["pdp_id"].astype(np.uint8),
+        }
+        columns.update(StatusEntry.from_array(columns["status"]))
+        return columns
+
+    @classmethod
+    def _from_projected_array(
+        cls, records: np.ndarray, columns: Collection[str]
+    ) -> dict[str, np.ndarray]:
+        # Same values as from_array, computed only for the requested columns
+        converters = {
+            "trip_time": cls._trip_time_to_double,
+            "packet_loss": cls._packet_loss_to_double,
+            "voltage": cls._voltage_to_double,
+            "rio": cls._roborio_cpu_to_double,
+            "can": cls._can_util_to_double,
+            "wifi": cls._wifi_db_to_double,
+            "bandwidth": cls._bandwidth_to_double,
+        }
+        decoded = {}
+        for name in cls.dtype.names:
+            if name not in columns:
+                continue
+            if name in converters:
+                decoded[name] = converters[name](records[name].astype(np.float64))
+            else:
+                decoded[name] = records[name].astype(np.uint8)
+        bits = [name for name in StatusEntry.__slots__ if name in columns]
+        if bits:
+            status = StatusEntry.from_array(records["status"].astype(np.uint8))
+            decoded.update((name, status[name]) for name in bits)
+        return decoded
+
     @classmethod
     def _trip_time_to_double(cls, trip_time: int) -> float:
         return trip_time * 0.5
@@ -97,7 +254,7 @@ class LogEntry(GenericEntry):
 
     @classmethod
     def length(cls) -> int:
-        return struct.calcsize(cls.byte_code)
+        return cls._struct.size
 
     def __str__(self) -> str:
         return (
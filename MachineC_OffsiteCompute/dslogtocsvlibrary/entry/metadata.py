@@ -1,12 +1,13 @@
 from __future__ import annotations
 import struct
 from datetime import datetime
-from .generic_entry import GenericEntry
+from .generic_entry import BufferLike, GenericEntry
 from .parse_date import parse_date
 
 
 class Metadata(GenericEntry):
     byte_code = ">iqQ"
+    _struct = struct.Struct(byte_code)
 
     def __init__(self, version: int, unix_time: float, offset: int):
         self.version = version
@@ -15,12 +16,16 @@ class Metadata(GenericEntry):
 
     @classmethod
     def from_bytes(cls, data: bytes) -> Metadata:
-        version, unix_time, offset = struct.unpack(cls.byte_code, data)
-        return cls(version, unix_time, offset)
+        return cls.from_buffer(data)
+
+    @classmethod
+    def from_buffer(cls, buffer: BufferLike, offset: int = 0) -> Metadata:
+        version, unix_time, date_offset = cls._struct.unpack_from(buffer, offset)
+        return cls(version, unix_time, date_offset)
 
     @classmethod
     def length(cls) -> int:
-        return struct.calcsize(cls.byte_code)
+        return cls._struct.size
 
     @property
     def date(self) -> datetime:
@@ -1,11 +1,34 @@
 from pytz import timezone
 from datetime import datetime, timedelta
 
+import numpy as np
+
 UINT64_MAX = (1 << 64) - 1
+UTC = timezone("UTC")
+EPOCH = datetime(1904, 1, 1, 0, 0, 0, 0, UTC)
+UNIX_EPOCH = datetime(1970, 1, 1, 0, 0, 0, 0, UTC)
+MICROSECOND = timedelta(microseconds=1)
 
 
 def parse_date(unix_time: float, offset: int) -> datetime:
-    epoch = datetime(1904, 1, 1, 0, 0, 0, 0, timezone("UTC"))
-    date = epoch + timedelta(seconds=unix_time)
-    date += timedelta(seconds=offset / UINT64_MAX)
-    return date
+    return EPOCH + timedelta(seconds=unix_time, microseconds=offset / UINT64_MAX * 1e6)
+
+
+def to_nanoseconds(date: datetime) -> int:
+    return (date - UNIX_EPOCH) // MICROSECOND * 1000
+
+
+def from_nanoseconds(timestamp: int) -> datetime:
+    return UNIX_EPOCH + timedelta(microseconds=timestamp // 1000)
+
+
+def format_nanoseconds(timestamps: np.ndarray) -> list[str]:
+    # Same text as str() of the matching UTC datetime, which drops the
+    # fraction when it is zero.
+    micros = timestamps // 1000
+    text = np.datetime_as_string(micros.astype("datetime64[us]"), unit="us").tolist()
+    whole = (micros % 1_000_000 == 0).tolist()
+    return [
+        (value[:19] if is_whole else value).replace("T", " ") + "+00:00"
+        for value, is_whole in zip(text, whole)
+    ]
@@ -2,11 +2,21 @@ from __future__ import annotations
 
 import struct
 
+import numpy as np
+
+from .generic_entry import BufferLike
 from .pdp_data import PdpData
 
 
 class PdpCtreData(PdpData):
+    __slots__ = ()
     byte_code = ">BQQ" + ("B" * 8)
+    _struct = struct.Struct(byte_code)
+    channels = 16
+    # Currents are packed six 10-bit values per big-endian 64-bit word,
+    # most significant first.
+    _word_index = np.arange(channels) // 6
+    _word_shift = (54 - 10 * (np.arange(channels) % 6)).astype(np.uint64)
 
     def __init__(
         self,
@@ -24,30 +34,44 @@ class PdpCtreData(PdpData):
 
     @classmethod
     def from_bytes(cls, data: bytes) -> PdpCtreData:
-        parsed = struct.unpack(cls.byte_code, data)
+        return cls.from_buffer(data)
+
+    @classmethod
+    def from_buffer(cls, buffer: BufferLike, offset: int = 0) -> PdpCtreData:
+        parsed = cls._struct.unpack_from(buffer, offset)
         pdp_id = parsed[0]
         longs = (
             parsed[1],
             parsed[2],
-            int.from_bytes(
-                b"".join([i.to_bytes(1, "big") for i in parsed[3:8]]) + b"\x00\x00\x00",
-                byteorder="big",
-            ),
+            int.from_bytes(bytes(parsed[3:8]), byteorder="big") << 24,
         )
         resistance = parsed[8]
         voltage = parsed[9] * 0.0736
         temperature = float(parsed[10])
-        currents = [0.0 for _ in range(16)]
+        currents = [0.0 for _ in range(cls.channels)]
         for index in range(len(currents)):
             data_index = index // 6
             data_offset = index % 6
             value = longs[data_index]
-            num = value << (data_offset * 10)
-            num = num >> 54
+            num = (value >> (54 - data_offset * 10)) & 0x3FF
             currents[index] = num / 8
 
         return cls(pdp_id, currents, resistance, voltage, temperature)
 
+    @classmethod
+    def from_array(cls, data: np.ndarray) -> dict[str, np.ndarray]:
+        payload = np.zeros((len(data), 24), dtype=np.uint8)
+        payload[:, :21] = data[:, 1:22]
+        words = payload.view(">u8")
+        currents = (words[:, cls._word_index] >> cls._word_shift) & 0x3FF
+        return {
+            "pdp_id": data[:, 0].copy(),
+            "currents": currents.astype(np.float32) / 8,
+            "voltage": data[:, 23].astype(np.float64) * 0.0736,
+            "resistance": data[:, 22].astype(np.float64),
+            "temperature": data[:, 24].astype(np.float64),
+        }
+
     @classmethod
     def length(cls) -> int:
-        return struct.calcsize(cls.byte_code)
+        return cls._struct.size
@@ -2,10 +2,15 @@ from __future__ import annotations
 
 from typing import Optional
 
+import numpy as np
+
 from .generic_entry import GenericEntry
 
 
 class PdpData(GenericEntry):
+    __slots__ = ("pdp_id", "currents", "voltage", "resistance", "temperature")
+    channels = 0
+
     def __init__(
         self,
         pdp_id: int = 0,
@@ -24,6 +29,19 @@ class PdpData(GenericEntry):
     def from_bytes(cls, data: bytes) -> PdpData:
         return PdpData()
 
+    @classmethod
+    def from_array(cls, data: np.ndarray) -> dict[str, np.ndarray]:
+        entries = [cls.from_bytes(row.tobytes()) for row in data]
+        return {
+            "pdp_id": np.array([entry.pdp_id for entry in entries], dtype=np.uint8),
+            "currents": np.array(
+                [entry.currents for entry in entries], dtype=np.float32
+            ).reshape(len(entries), cls.channels),
+            "voltage": np.array([entry.voltage for entry in entries], dtype=np.float64),
+            "resistance": np.array([entry.resistance for entry in entries], dtype=np.float64),
+            "temperature": np.array([entry.temperature for entry in entries], dtype=np.float64),
+        }
+
     @classmethod
     def length(cls) -> int:
         return 0
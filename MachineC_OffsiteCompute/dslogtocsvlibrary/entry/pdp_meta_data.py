@@ -1,25 +1,39 @@
 from __future__ import annotations
 import struct
-from .generic_entry import GenericEntry
+from .generic_entry import BufferLike, GenericEntry
 from .pdp_type import PdpType
 
 
 class PdpMetaData(GenericEntry):
+    __slots__ = ("type",)
     byte_code = ">BBB"
+    _struct = struct.Struct(byte_code)
 
     def __init__(self, type: PdpType) -> None:
         self.type = type
 
     @classmethod
     def from_bytes(cls, data: bytes) -> PdpMetaData:
-        _, _, pdp_type = struct.unpack(cls.byte_code, data)
-        return cls(PdpType(pdp_type))
+        return cls.from_buffer(data)
+
+    @classmethod
+    def from_buffer(cls, buffer: BufferLike, offset: int = 0) -> PdpMetaData:
+        _, _, pdp_type = cls._struct.unpack_from(buffer, offset)
+        return cls.from_type(PdpType(pdp_type))
+
+    @classmethod
+    def from_type(cls, pdp_type: PdpType) -> PdpMetaData:
+        return _INTERNED[pdp_type]
 
     @classmethod
     def length(cls) -> int:
-        return struct.calcsize(cls.byte_code)
+        return cls._struct.size
 
     def __str__(self) -> str:
         return f"{self.__class__.__name__}(type={self.type})"
 
     __repr__ = __str__
+
+
+# Only three PDP types exist, so every decoded record shares one of these.
+_INTERNED = {pdp_type: PdpMetaData(pdp_type) for pdp_type in PdpType}
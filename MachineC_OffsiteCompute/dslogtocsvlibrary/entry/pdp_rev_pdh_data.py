@@ -2,6 +2,9 @@ from __future__ import annotations
 
 import struct
 
+import numpy as np
+
+from .generic_entry import BufferLike
 from .pdp_data import PdpData
 
 
@@ -10,7 +13,14 @@ def reverse_endian(value: int, int_size: int) -> int:
 
 
 class PdpRevPdhData(PdpData):
-    byte_code = ">B" + ("I" * 6) + ("B" * 3) + ("B" * 5)
+    __slots__ = ()
+    # The six current words are little-endian; reading them as such replaces
+    # a reverse_endian() call per word.
+    byte_code = "<B" + ("I" * 6) + ("B" * 3) + ("B" * 5)
+    _struct = struct.Struct(byte_code)
+    channels = 24
+    _word_index = np.arange(21) // 3
+    _word_shift = (10 * (np.arange(21) % 3)).astype(np.uint32)
 
     def __init__(self, pdp_id: int, currents: list[float], temperature: float) -> None:
         self.pdp_id = pdp_id
@@ -21,18 +31,16 @@ class PdpRevPdhData(PdpData):
 
     @classmethod
     def from_bytes(cls, data: bytes) -> PdpRevPdhData:
-        parsed = struct.unpack(cls.byte_code, data)
-        pdp_id = data[0]
-        ints = []
-        for i in range(1, 7):
-            ints.append(reverse_endian(parsed[i], 4))
-        # Append the new value instead of assigning to index 6
-        ints.append(int.from_bytes(
-            b"".join([i.to_bytes(1, "big") for i in parsed[7:10]]) + b"\x00",
-            byteorder="big",
-        ))
-
-        currents = [0.0 for _ in range(24)]
+        return cls.from_buffer(data)
+
+    @classmethod
+    def from_buffer(cls, buffer: BufferLike, offset: int = 0) -> PdpRevPdhData:
+        parsed = cls._struct.unpack_from(buffer, offset)
+        pdp_id = parsed[0]
+        ints = list(parsed[1:7])
+        ints.append(int.from_bytes(bytes(parsed[7:10]), byteorder="big") << 8)
+
+        currents = [0.0 for _ in range(cls.channels)]
         # Process only the first 21 currents using ints (7 groups of 3)
         for index in range(21):  # Changed from 24 to 21
             data_index = index // 3
@@ -47,6 +55,25 @@ class PdpRevPdhData(PdpData):
 
         return cls(pdp_id, currents, temperature)
 
+    @classmethod
+    def from_array(cls, data: np.ndarray) -> dict[str, np.ndarray]:
+        count = len(data)
+        words = np.empty((count, 7), dtype=np.uint32)
+        words[:, :6] = np.ascontiguousarray(data[:, 1:25]).view("<u4")
+        tail = np.zeros((count, 4), dtype=np.uint8)
+        tail[:, :3] = data[:, 25:28]
+        words[:, 6] = tail.view(">u4")[:, 0]
+        currents = np.empty((count, cls.channels), dtype=np.float32)
+        currents[:, :21] = ((words[:, cls._word_index] >> cls._word_shift) & 0x3FF) / 8
+        currents[:, 20:] = data[:, 28:32] / 16
+        return {
+            "pdp_id": data[:, 0].copy(),
+            "currents": currents,
+            "voltage": np.zeros(count, dtype=np.float64),
+            "resistance": np.zeros(count, dtype=np.float64),
+            "temperature": data[:, 32].astype(np.float64),
+        }
+
     @classmethod
     def length(cls) -> int:
-        return struct.calcsize(cls.byte_code)
+        return cls._struct.size
@@ -1,7 +1,19 @@
 from __future__ import annotations
 
+import numpy as np
+
 
 class StatusEntry:
+    __slots__ = (
+        "brownout",
+        "watchdog",
+        "ds_teleop",
+        "ds_disabled",
+        "robot_teleop",
+        "robot_autonomous",
+        "robot_disabled",
+    )
+
     def __init__(
         self,
         brownout,
@@ -22,6 +34,10 @@ class StatusEntry:
 
     @classmethod
     def from_int(cls, status: int) -> StatusEntry:
+        return _INTERNED[status]
+
+    @classmethod
+    def _decode(cls, status: int) -> StatusEntry:
         return cls(
             brownout=(status >> 7) & 1,
             watchdog=(status >> 6) & 1,
@@ -32,6 +48,18 @@ class StatusEntry:
             robot_disabled=status & 1,
         )
 
+    @classmethod
+    def from_array(cls, status: np.ndarray) -> dict[str, np.ndarray]:
+        return {
+            "brownout": (status >> 7) & 1,
+            "watchdog": (status >> 6) & 1,
+            "ds_teleop": (status >> 5) & 1,
+            "ds_disabled": (status >> 3) & 1,
+            "robot_teleop": (status >> 2) & 1,
+            "robot_autonomous": (status >> 1) & 1,
+            "robot_disabled": status & 1,
+        }
+
     def __str__(self) -> str:
         return (
             f"{self.__class__.__name__}("
@@ -43,3 +71,7 @@ class StatusEntry:
             f"robot_autonomous={self.robot_autonomous}, "
             f"robot_disabled={self.robot_disabled})"
         )
+
+
+# A status byte has only 256 values; decoded records share these instances.
+_INTERNED = tuple(StatusEntry._decode(status) for status in range(256))
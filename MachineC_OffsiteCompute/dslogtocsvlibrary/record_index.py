@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from array import array
+from typing import Optional
+
+import numpy as np
+
+
+class RecordIndex:
+    def __init__(
+        self, start: int, count: int, stride: int = 0, offsets: Optional[array] = None
+    ) -> None:
+        self.start = start
+        self.count = count
+        self.stride = stride
+        self.offsets = offsets
+
+    @classmethod
+    def fixed(cls, start: int, count: int, stride: int) -> RecordIndex:
+        return cls(start, count, stride=stride)
+
+    @classmethod
+    def from_offsets(cls, offsets: array) -> RecordIndex:
+        start = offsets[0] if offsets else 0
+        return cls(start, len(offsets), offsets=offsets)
+
+    @property
+    def is_fixed(self) -> bool:
+        return self.offsets is None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def offset(self, index: int) -> int:
+        if self.offsets is None:
+            return self.start + index * self.stride
+        return self.offsets[index]
+
+    def to_array(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        stop = self.count if stop is None else stop
+        if self.offsets is None:
+            return self.start + np.arange(start, stop, dtype=np.int64) * self.stride
+        return np.frombuffer(self.offsets, dtype=np.uint64)[start:stop].astype(np.int64)
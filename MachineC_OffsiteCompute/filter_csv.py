@@ -1,37 +1,50 @@
 import csv
 import ast
+import os
 import sys
+from compressed_io import compression_from_name, open_compressed
 
 # Usage: python filter_csv.py input.csv output.csv
+# Either file may be gzip/zstd-compressed: the input is detected from its
+# contents, and an output name ending in .gz or .zst is compressed as written.
 
 def process_csv(input_path, output_path):
-    # Read and filter data into memory
-    filtered_rows = []
-    with open(input_path, 'r', newline='') as infile:
-        reader = csv.DictReader(infile)
-        for row in reader:
-            date = row.get('date', '')
-            voltage = row.get('voltage', '')
-            currents_str = row.get('pdp_data_currents', '[]')
-            try:
-                currents = ast.literal_eval(currents_str)
-                if isinstance(currents, list):
-                    total_current = sum(currents)
-                else:
-                    total_current = 0.0
-            except Exception:
-                total_current = 0.0
-            filtered_rows.append({
-                'date': date,
-                'voltage': voltage,
-                'total_current': total_current
-            })
-    # Overwrite the input file with filtered data
+    # Stream the filtered rows into a new file and rename it over output_path
+    # (usually the input itself). Replacing rather than truncating matters
+    # when the input is hardlinked into storage: the published copy keeps
+    # the full data.
     fieldnames = ['date', 'voltage', 'total_current']
-    with open(input_path, 'w', newline='') as outfile:
-        writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(filtered_rows)
+    part_path = output_path + '.part'
+    compression = compression_from_name(output_path)
+    try:
+        with open_compressed(input_path, 'rt', newline='') as infile, \
+                open_compressed(part_path, 'wt', compression, newline='') as outfile:
+            reader = csv.DictReader(infile)
+            writer = csv.DictWriter(outfile, fieldnames=fieldnames)
+            writer.writeheader()
+            for row in reader:
+                date = row.get('date', '')
+                voltage = row.get('voltage', '')
+                currents_str = row.get('pdp_data_currents', '[]')
+                try:
+                    currents = ast.literal_eval(currents_str)
+                    if isinstance(currents, list):
+                        total_current = sum(currents)
+                    else:
+                        total_current = 0.0
+                except Exception:
+                    total_current = 0.0
+                writer.writerow({
+                    'date': date,
+                    'voltage': voltage,
+                    'total_current': total_current
+                })
+    except Exception:
+        # Don't leave a half-written .part behind
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+    os.replace(part_path, output_path)
 
 if __name__ == "__main__":
     if len(sys.argv) not in (2, 3):
@@ -92,56 +92,45 @@ else
   echo "[i] $SERVICE_FILE already exists — skipping creation"
 fi
 
-echo "[i] Creating systemd service and timer to check Drive and run main.py only when new files exist"
-CHECK_SERVICE=/etc/systemd/system/offsite-check.service
-CHECK_TIMER=/etc/systemd/system/offsite-check.timer
+echo "[i] Creating systemd service for the Drive pipeline daemon (long-running)"
+PIPELINE_SERVICE=/etc/systemd/system/offsite-pipeline.service
 
-if [ ! -f "$CHECK_SERVICE" ]; then
-  sudo bash -c "cat > $CHECK_SERVICE" <<EOF
+if [ ! -f "$PIPELINE_SERVICE" ]; then
+  sudo bash -c "cat > $PIPELINE_SERVICE" <<EOF
 [Unit]
-Description=Offsite Compute - check Drive and run main.py if new files exist
+Description=Offsite Compute - watch Drive and convert new driver station logs
 After=network-online.target
+Wants=network-online.target
 
 [Service]
-Type=oneshot
 User=$CURRENT_USER
 WorkingDirectory=$MACHINE_DIR
-ExecStart=$VENV_DIR/bin/python3 $MACHINE_DIR/check_and_run_main.py
+ExecStart=$VENV_DIR/bin/python3 $MACHINE_DIR/main.py --daemon
+Restart=on-failure
+RestartSec=30
 EnvironmentFile=$MACHINE_DIR/.env
 
 [Install]
 WantedBy=multi-user.target
 EOF
-  echo "[i] Created $CHECK_SERVICE"
+  echo "[i] Created $PIPELINE_SERVICE"
 else
-  echo "[i] $CHECK_SERVICE already exists — skipping"
+  echo "[i] $PIPELINE_SERVICE already exists — skipping"
 fi
 
-if [ ! -f "$CHECK_TIMER" ]; then
-  sudo bash -c "cat > $CHECK_TIMER" <<EOF
-[Unit]
-Description=Run offsite-check.service every 10 minutes
-
-[Timer]
-OnBootSec=1min
-OnUnitActiveSec=10min
-Persistent=true
-
-[Install]
-WantedBy=timers.target
-EOF
-  echo "[i] Created $CHECK_TIMER"
-else
-  echo "[i] $CHECK_TIMER already exists — skipping"
+# Older installs polled with a 10-minute timer; the daemon replaces it
+if systemctl list-unit-files offsite-check.timer >/dev/null 2>&1; then
+  echo "[i] Disabling the old offsite-check.timer (replaced by offsite-pipeline.service)"
+  sudo systemctl disable --now offsite-check.timer || true
 fi
 
 echo "[i] Reloading systemd daemon and enabling services/timers"
 sudo systemctl daemon-reload
 sudo systemctl enable --now offsite-firebase-scraper.service || true
-sudo systemctl enable --now offsite-check.timer || true
+sudo systemctl enable --now offsite-pipeline.service || true
 
 echo "[✓] Installation complete."
 echo "[i] Check service logs with: sudo journalctl -u offsite-firebase-scraper.service -f"
-echo "[i] Check timer status with: systemctl list-timers --all | grep offsite-check"
+echo "[i] Check pipeline logs with: sudo journalctl -u offsite-pipeline.service -f"
 
 echo "[i] If you did not provide a Tailscale auth key and want remote access, run: sudo tailscale up and follow the interactive flow."
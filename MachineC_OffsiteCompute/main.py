@@ -1,11 +1,35 @@
 
 import os
+import csv
 import time
 import shutil
-import subprocess
-from drive_sync import get_service, list_new_files, download_file, get_folder_id_by_name
+import hashlib
+import signal
+import argparse
+import datetime
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from drive_sync import (
+    DOWNLOAD_WORKERS,
+    download_file,
+    file_revision,
+    file_size,
+    get_folder_id_by_name,
+    get_service,
+    list_changed_files,
+    stream_file,
+    worker_http,
+)
 from dotenv import load_dotenv
 from parser import parse_dsevents
+from manifest import PROCESSED, Manifest, file_hash
+from battery_health import FLEET_FILENAME, UNKNOWN_BATTERY, write_fleet
+from DSConverter import DSConvertor
+from filter_csv import process_csv
+from compressed_io import compression_from_name, strip_compression, with_compression
+from pipeline import Pipeline, Stage
 
 load_dotenv()
 
@@ -15,96 +39,434 @@ DRIVE_FOLDER_NAME = os.getenv('DRIVE_FOLDER_NAME', 'DRIVER_STATION_LOGS')
 TEMP_DIR = "temp"
 DSLOG_DIR = "csvDSLogs"  # Output dir for DSConverter
 LOCAL_STORAGE = os.getenv('LOCAL_STORAGE_PATH', '/mnt/storage/csvlogs')  # Change to your local storage server path
+# csv (default), parquet or feather; the columnar formats need pyarrow
+OUTPUT_FORMAT = os.getenv('DSLOG_OUTPUT_FORMAT', 'csv')
+# none (default), gzip or zstd: compress CSV outputs as they are written
+# (zstd needs the zstandard package)
+COMPRESSION = os.getenv('DSLOG_COMPRESSION', 'none')
+# off, alongside (default) or only: write <name>.summary.csv (date, voltage,
+# total_current) straight from the decoded logs instead of filtering CSVs
+SUMMARY_MODE = os.getenv('DSLOG_SUMMARY', 'alongside')
+# Also write <name>.rollups.csv: min/max/mean/last per 1 s, 10 s and enabled
+# period, for dashboards that don't need every 20 ms record (0 to turn off)
+ROLLUPS = os.getenv('DSLOG_ROLLUPS', '1') == '1'
+# Fit battery internal resistance per enabled period (<name>.health.csv) and
+# keep battery_fleet.csv up to date from the cached fits (0 to turn off)
+HEALTH = os.getenv('DSLOG_HEALTH', '1') == '1'
+# Number of .dslog files converted in parallel
+DSLOG_JOBS = int(os.getenv('DSLOG_JOBS', os.cpu_count() or 1))
+# Conversion workers start from a clean fork server rather than a fork of
+# this process: by the time the first one starts, the pipeline's download,
+# publish and filter threads are running and may hold locks a child would
+# inherit forever
+MP_CONTEXT = multiprocessing.get_context('forkserver')
+# Daemon mode (main.py --daemon): seconds between Drive polls. The interval
+# starts at POLL_FAST_SECONDS after new files arrive and doubles on every
+# quiet poll up to POLL_IDLE_SECONDS.
+POLL_FAST_SECONDS = int(os.getenv('POLL_FAST_SECONDS', 15))
+POLL_IDLE_SECONDS = int(os.getenv('POLL_IDLE_SECONDS', 300))
+# Comma-separated competition dates (YYYY-MM-DD); from the day before to the
+# day after each one the daemon always polls at the fast rate
+EVENT_DATES = os.getenv('EVENT_DATES', '')
+# Set to 1 to decode .dslog files while they download instead of writing them
+# to temp/ first. Streamed logs are decoded on the convert threads of this
+# process, not in the DSLOG_JOBS process pool, so this suits a single small
+# machine better than a multi-core one. With DSLOG_ARCHIVE_RAW=1 the raw log
+# is still saved to temp/ as it streams past.
+STREAM_DOWNLOADS = os.getenv('DSLOG_STREAM', '0') == '1'
+ARCHIVE_RAW = os.getenv('DSLOG_ARCHIVE_RAW', '0') == '1'
 
-def run_dsconverter(dslog_dir):
-    # Run DSConverter.py to process all .dslog files in dslog_dir
-    # Pass the directory where .dslog files were downloaded so DSConverter processes them
-    subprocess.run(["python3", "DSConverter.py", dslog_dir], check=True)
+# Convert workers finish logs concurrently; one fleet table rewrite at a time
+FLEET_LOCK = threading.Lock()
 
-def copy_and_verify(src, dst):
-    shutil.copy2(src, dst)
-    # Verify by comparing file sizes
-    return os.path.getsize(src) == os.path.getsize(dst)
+def copy_with_hash(src, dst, chunk_size=1 << 20):
+    # Copy src to dst, returning the SHA-256 of the bytes read from src and
+    # the stat of the file they were read from (taken before reading, so a
+    # concurrent rewrite shows up as a changed mtime next time)
+    digest = hashlib.sha256()
+    with open(src, 'rb') as fin, open(dst, 'wb') as fout:
+        stat = os.fstat(fin.fileno())
+        while chunk := fin.read(chunk_size):
+            digest.update(chunk)
+            fout.write(chunk)
+        fout.flush()
+        os.fsync(fout.fileno())
+    shutil.copystat(src, dst)
+    return digest.hexdigest(), stat
 
-def filter_csv_inplace(csv_path):
-    subprocess.run(["python3", "filter_csv.py", csv_path], check=True)
+def publish_file(manifest, src, dst):
+    """Hardlink or copy src over dst; return 'unchanged', 'linked' or 'copied'."""
+    # Skip outputs with the same size and mtime as last time, or the same SHA-256
+    stat = os.stat(src)
+    published = manifest.get_published(dst)
+    if published and os.path.exists(dst):
+        if (published['source_size'], published['source_mtime_ns']) == (stat.st_size, stat.st_mtime_ns):
+            return 'unchanged'
+        content_hash = file_hash(src)
+        if published['content_hash'] == content_hash:
+            manifest.mark_published(dst, stat.st_size, stat.st_mtime_ns, content_hash)
+            return 'unchanged'
 
-def main():
-    service = get_service()
-    os.makedirs(TEMP_DIR, exist_ok=True)
-    os.makedirs(DSLOG_DIR, exist_ok=True)
-    os.makedirs(LOCAL_STORAGE, exist_ok=True)
+    part_path = dst + '.part'
+    if os.path.exists(part_path):
+        os.remove(part_path)
+    try:
+        os.link(src, part_path)
+    except OSError:
+        # Different filesystem (or no hardlink support): copy and verify
+        content_hash, stat = copy_with_hash(src, part_path)
+        if file_hash(part_path) != content_hash:
+            os.remove(part_path)
+            raise IOError(f"checksum mismatch copying {src} to {dst}")
+        method = 'copied'
+    else:
+        # Describe the inode that gets published, not whatever src names now
+        stat = os.stat(part_path)
+        content_hash = file_hash(part_path)
+        method = 'linked'
+    os.replace(part_path, dst)
+    manifest.mark_published(dst, stat.st_size, stat.st_mtime_ns, content_hash)
+    return method
 
-    # Resolve the folder ID from the folder name (user's Drive root)
-    print(f"[+] Resolving Drive folder name: {DRIVE_FOLDER_NAME}")
-    folder_id = get_folder_id_by_name(service, DRIVE_FOLDER_NAME)
-    if not folder_id:
-        print("[!] Could not find the Drive folder. Aborting.")
-        return
+def parse_dsevents_file(manifest, fname):
+    # Turn a downloaded .dsevents file into a small CSV entry so it gets published
+    src = os.path.join(TEMP_DIR, fname)
+    tag = parse_dsevents(src)
+    out_name = fname.replace('.dsevents', '.dsevents.csv')
+    out_path = os.path.join(DSLOG_DIR, out_name)
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    part_path = out_path + '.part'
+    with open(part_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['source_file', 'battery_id', 'timestamp', 'message'])
+        if tag is None:
+            writer.writerow([fname, UNKNOWN_BATTERY, '', ''])
+        else:
+            writer.writerow([fname, tag.battery_id, tag.timestamp, tag.message])
+    os.replace(part_path, out_path)
+    print(f"  └─ parsed dsevents -> {out_path}")
+    if tag is not None:
+        # Logs of the same session share the file stem; their fits in the
+        # fleet table now count towards this battery
+        manifest.set_battery(fname[:-len('.dsevents')], tag.battery_id)
+    # Record the original .dsevents file in the manifest so it won't be reprocessed
+    try:
+        manifest.mark(
+            fname,
+            PROCESSED,
+            size=os.path.getsize(src),
+            content_hash=file_hash(src),
+            outputs=[out_name],
+        )
+        print(f"  └─ recorded {fname} in manifest")
+    except Exception as e:
+        print(f"[!] Failed to update manifest: {e}")
+    return [out_name]
+
+def update_fleet(manifest):
+    """Rewrite battery_fleet.csv from the fits cached in the manifest."""
+    with FLEET_LOCK:
+        batteries = write_fleet(manifest, os.path.join(DSLOG_DIR, FLEET_FILENAME))
+    print(f"  └─ updated {FLEET_FILENAME} ({batteries} batteries)")
+    return FLEET_FILENAME
+
+def needs_filter(fname):
+    name = strip_compression(fname)
+    if not name.endswith(".csv"):
+        return False
+    # Skip files produced from .dsevents (we leave those unfiltered)
+    if name.endswith('.dsevents.csv'):
+        print(f"[i] Skipping filtering for dsevents CSV: {fname}")
+        return False
+    # Summaries, rollups and health fits are already reduced; a CSV with a
+    # summary needs no pass
+    if name.endswith(('.rollups.csv', '.health.csv')) or name == FLEET_FILENAME:
+        return False
+    summary = with_compression(name[:-4] + '.summary.csv', compression_from_name(fname))
+    if name.endswith('.summary.csv') or os.path.exists(os.path.join(DSLOG_DIR, summary)):
+        return False
+    return True
+
+class ConvertPool:
+    # The convert stage's worker processes. A worker that dies (say,
+    # OOM-killed on a huge log) breaks a ProcessPoolExecutor for good, so the
+    # broken pool is replaced and each log that was on it is converted again
+    # in a process of its own; only the one that kills its worker fails.
+    def __init__(self, workers):
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.pool = self.new_pool()
+
+    def new_pool(self):
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=MP_CONTEXT)
+
+    def convert(self, converter, name):
+        pool = self.pool
+        try:
+            return pool.submit(converter.convertFile, name).result()
+        except BrokenProcessPool:
+            with self.lock:
+                if self.pool is pool:
+                    print("[!] A conversion worker died; starting a new process pool")
+                    self.pool = self.new_pool()
+                    pool.shutdown(wait=False)
+        return converter.convertAlone(name, MP_CONTEXT)
 
-    # Step 1: Download all .dslog and .dsevents files from Drive
-    files = list_new_files(service, folder_id)
-    for file in files:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.pool.shutdown()
+
+def build_pipeline(service, manifest, converter, pool, on_done=None):
+    """Wire the download -> convert -> publish -> filter stages."""
+    # Conversion runs in the process pool, except for STREAM_DOWNLOADS .dslog
+    # files, which skip the download stage and decode on the convert threads
+
+    def download(file):
         name = file['name']
-        fid = file['id']
         local_path = os.path.join(TEMP_DIR, name)
-        if not os.path.exists(local_path):
+        modified = file.get('modifiedTime')
+        changed = not manifest.is_processed(name, modified) and manifest.is_processed(name)
+        if file.get('id') and (not os.path.exists(local_path) or changed):
+            if STREAM_DOWNLOADS and name.endswith('.dslog'):
+                return file
             print(f"[+] Downloading {name}...")
-            download_file(service, fid, local_path)
+            download_file(
+                service,
+                file['id'],
+                local_path,
+                http=worker_http(service),
+                size=file_size(file),
+                revision=file_revision(file),
+                md5=file.get('md5Checksum'),
+            )
+            manifest.record_download(name, os.path.getsize(local_path), modified)
+        if manifest.is_processed(name) or not os.path.exists(local_path):
+            return None
+        return name
 
-    # Step 1b: Process any downloaded .dsevents files into CSVs so they get copied & filtered
-    for fname in os.listdir(TEMP_DIR):
-        if fname.endswith('.dsevents'):
-            src = os.path.join(TEMP_DIR, fname)
-            try:
-                batt_id = parse_dsevents(src)
-                out_name = fname.replace('.dsevents', '.dsevents.csv')
-                out_path = os.path.join(DSLOG_DIR, out_name)
-                os.makedirs(os.path.dirname(out_path), exist_ok=True)
-                with open(out_path, 'w', newline='') as f:
-                    f.write('source_file,battery_id\n')
-                    # Quote fields if necessary
-                    f.write(f'"{fname}","{batt_id}"\n')
-                print(f"  └─ parsed dsevents -> {out_path}")
-                # Add the original .dsevents filename to the exclusion list so it won't be reprocessed
-                exclusion_fp = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'exclusionListFP.txt')
-                try:
-                    with open(exclusion_fp, 'a') as exf:
-                        exf.write(fname + "\n")
-                    print(f"  └─ added {fname} to exclusion list")
-                except Exception as e:
-                    print(f"[!] Failed to write to exclusion list: {e}")
-            except Exception as e:
-                print(f"[!] Failed to parse {fname}: {e}")
+    def stream(file):
+        name = file['name']
+        archive_path = os.path.join(TEMP_DIR, name) if ARCHIVE_RAW else None
+        print(f"[+] Streaming {name}...")
+        sink = stream_file(
+            service,
+            file['id'],
+            lambda: converter.openStream(name, archive_path),
+            http=worker_http(service),
+        )
+        result = sink.close()
+        manifest.record_download(name, result["size"], file.get('modifiedTime'))
+        return with_fleet(converter.recordResult(result))
 
-    # Step 2: Run DSConverter.py to convert all .dslog files to CSV
-    run_dsconverter(TEMP_DIR)
+    def with_fleet(result):
+        outputs = result["outputs"]
+        if outputs and result.get("health") is not None:
+            outputs = outputs + [update_fleet(manifest)]
+        return outputs or None
 
-    # Step 3: Copy and verify all CSVs to local storage
-    for fname in os.listdir(DSLOG_DIR):
-        if fname.endswith(".csv"):
+    def convert(name):
+        if isinstance(name, dict):
+            return stream(name)
+        if name.endswith('.dsevents'):
+            outputs = parse_dsevents_file(manifest, name)
+            return outputs + [update_fleet(manifest)] if HEALTH else outputs
+        return with_fleet(converter.recordResult(pool.convert(converter, name)))
+
+    def publish(outputs):
+        for fname in outputs:
             src = os.path.join(DSLOG_DIR, fname)
             dst = os.path.join(LOCAL_STORAGE, fname)
-            print(f"[+] Copying {fname} to storage...")
-            if copy_and_verify(src, dst):
-                print(f"  └─ Verified {fname}")
+            method = publish_file(manifest, src, dst)
+            if method == 'unchanged':
+                print(f"[i] {fname} unchanged in storage; skipped")
             else:
-                print(f"  └─ Verification failed for {fname}")
-
-    # Step 4: Filter all CSVs in-place, but skip dsevents-derived CSVs
-    for fname in os.listdir(DSLOG_DIR):
-        if not fname.endswith(".csv"):
-            continue
-        # Skip files produced from .dsevents (we leave those unfiltered)
-        if fname.endswith('.dsevents.csv'):
-            print(f"[i] Skipping filtering for dsevents CSV: {fname}")
-            continue
-        csv_path = os.path.join(DSLOG_DIR, fname)
-        print(f"[+] Filtering {fname}...")
-        filter_csv_inplace(csv_path)
-        print(f"  └─ Filtered {fname}")
+                print(f"[+] Published {fname} to storage ({method})")
+        return outputs
+
+    def filter_outputs(outputs):
+        for fname in outputs:
+            if needs_filter(fname):
+                print(f"[+] Filtering {fname}...")
+                csv_path = os.path.join(DSLOG_DIR, fname)
+                process_csv(csv_path, csv_path)
+                print(f"  └─ Filtered {fname}")
+        return None
+
+    return Pipeline([
+        Stage("download", download, workers=DOWNLOAD_WORKERS),
+        Stage("convert", convert, workers=DSLOG_JOBS),
+        Stage("publish", publish),
+        Stage("filter", filter_outputs),
+    ], on_done=on_done)
+
+def cursor_key(folder_id):
+    return f"drive_changes_cursor:{folder_id}"
+
+def list_pending(service, manifest, folder_id):
+    """Return (files, cursor): Drive files changed since the stored cursor
+    that still need processing, and the cursor to commit once they are done."""
+    files, cursor = list_changed_files(service, folder_id, manifest.get_state(cursor_key(folder_id)))
+    pending = [
+        f for f in files
+        if f.get('name') and not manifest.is_processed(f['name'], f.get('modifiedTime'))
+    ]
+    return pending, cursor
+
+def commit_cursor(manifest, folder_id, files, cursor):
+    """Store cursor if every listed file settled; otherwise keep the old one
+    so the unfinished files are listed again next time."""
+    unsettled = [f['name'] for f in files if not manifest.is_settled(f['name'], f.get('modifiedTime'))]
+    if unsettled:
+        print(f"[i] {len(unsettled)} file(s) unfinished; they will be listed again next run.")
+        return False
+    manifest.set_state(cursor_key(folder_id), cursor)
+    return True
+
+def leftover_files(listed):
+    """Earlier downloads in temp/ that were never processed and aren't in listed."""
+    return [
+        {'name': fname}
+        for fname in os.listdir(TEMP_DIR)
+        if fname.endswith(('.dslog', '.dsevents')) and fname not in listed
+    ]
+
+def run_pipeline(service, manifest, files):
+    """Push the given Drive files (plus unprocessed leftovers in temp/) through
+    the pipeline. Returns the number of failed steps."""
+    os.makedirs(TEMP_DIR, exist_ok=True)
+    os.makedirs(DSLOG_DIR, exist_ok=True)
+    os.makedirs(LOCAL_STORAGE, exist_ok=True)
+
+    leftovers = leftover_files({file['name'] for file in files})
+    converter = DSConvertor(
+        TEMP_DIR,
+        outputFormat=OUTPUT_FORMAT,
+        summary=SUMMARY_MODE,
+        compression=COMPRESSION,
+        rollups=ROLLUPS,
+        health=HEALTH,
+    )
+    with ConvertPool(DSLOG_JOBS) as pool:
+        pipeline = build_pipeline(service, manifest, converter, pool)
+        pipeline.start()
+        for file in files + leftovers:
+            pipeline.put(file)
+        pipeline.close()
+        pipeline.join()
 
+    if pipeline.failures:
+        print(f"[!] Pipeline finished with {pipeline.failures} failed step(s).")
     print("[✓] Pipeline complete.")
+    return pipeline.failures
+
+def parse_event_dates(value):
+    dates = set()
+    for part in value.split(','):
+        part = part.strip()
+        if part:
+            dates.add(datetime.date.fromisoformat(part))
+    return dates
+
+def poll_interval(today, quiet_polls, event_dates):
+    """Seconds until the next Drive poll: fast around event days and new files."""
+    if any(abs((today - day).days) <= 1 for day in event_dates):
+        return POLL_FAST_SECONDS
+    return min(POLL_IDLE_SECONDS, POLL_FAST_SECONDS * 2 ** quiet_polls)
+
+def run_daemon(service, manifest, folder_id):
+    """Poll Drive until SIGTERM/SIGINT, feeding new files into one long-lived pipeline."""
+    event_dates = parse_event_dates(EVENT_DATES)
+    for path in (TEMP_DIR, DSLOG_DIR, LOCAL_STORAGE):
+        os.makedirs(path, exist_ok=True)
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    in_flight = set()
+    lock = threading.Lock()
+
+    def done(file):
+        with lock:
+            in_flight.discard(file['name'])
+
+    def queue_files(files):
+        with lock:
+            new = [file for file in files if file['name'] not in in_flight]
+            in_flight.update(file['name'] for file in new)
+        for file in new:
+            pipeline.put(file)
+        return new
+
+    converter = DSConvertor(
+        TEMP_DIR,
+        outputFormat=OUTPUT_FORMAT,
+        summary=SUMMARY_MODE,
+        compression=COMPRESSION,
+        rollups=ROLLUPS,
+        health=HEALTH,
+    )
+    with ConvertPool(DSLOG_JOBS) as pool:
+        pipeline = build_pipeline(service, manifest, converter, pool, on_done=done)
+        pipeline.start()
+        queue_files(leftover_files(set()))
+        print(f"[+] Watching Drive folder {DRIVE_FOLDER_NAME} (Ctrl+C to stop)")
+
+        quiet_polls = 0
+        while not stop.is_set():
+            try:
+                files, cursor = list_pending(service, manifest, folder_id)
+            except Exception as e:
+                print(f"[!] Drive poll failed: {e}")
+                files, cursor = [], None
+
+            queued = queue_files(files)
+            if queued:
+                print(f"[+] Queued {len(queued)} new file(s).")
+                quiet_polls = 0
+            else:
+                quiet_polls += 1
+
+            # Move the cursor once nothing it covers is still being worked on
+            with lock:
+                busy = any(file['name'] in in_flight for file in files)
+            if cursor is not None and not busy:
+                commit_cursor(manifest, folder_id, files, cursor)
+
+            stop.wait(poll_interval(datetime.date.today(), quiet_polls, event_dates))
+
+        print("[i] Stopping; waiting for files in flight...")
+        pipeline.close()
+        pipeline.join()
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Download, convert and publish driver station logs from Drive.")
+    arg_parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="keep running and poll Drive for new logs instead of doing a single pass",
+    )
+    args = arg_parser.parse_args()
+
+    manifest = Manifest()
+    service = get_service()
+
+    # Resolve the folder ID from the folder name (user's Drive root)
+    print(f"[+] Resolving Drive folder name: {DRIVE_FOLDER_NAME}")
+    folder_id = get_folder_id_by_name(service, DRIVE_FOLDER_NAME)
+    if not folder_id:
+        print("[!] Could not find the Drive folder. Aborting.")
+        return
+
+    if args.daemon:
+        run_daemon(service, manifest, folder_id)
+        return
+
+    files, cursor = list_pending(service, manifest, folder_id)
+    run_pipeline(service, manifest, files)
+    commit_cursor(manifest, folder_id, files, cursor)
 
 if __name__ == "__main__":
     main()
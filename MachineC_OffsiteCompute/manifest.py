@@ -0,0 +1,264 @@
+"""Processing manifest: which Drive files the offsite pipeline has seen, processed and published."""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from threading import Lock
+from typing import Iterable, Optional
+
+ROOT = os.path.dirname(os.path.realpath(__file__))
+MANIFEST_PATH = os.path.join(ROOT, "manifest.sqlite3")
+LEGACY_EXCLUSION_FP = os.path.join(ROOT, "exclusionListFP.txt")
+
+DOWNLOADED = "downloaded"
+PROCESSED = "processed"
+EMPTY = "empty"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    name TEXT PRIMARY KEY,
+    size INTEGER,
+    modified_time TEXT,
+    content_hash TEXT,
+    status TEXT NOT NULL,
+    outputs TEXT NOT NULL DEFAULT '[]',
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS published (
+    path TEXT PRIMARY KEY,
+    source_size INTEGER NOT NULL,
+    source_mtime_ns INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    published_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS battery_health (
+    log TEXT NOT NULL,
+    stem TEXT NOT NULL,
+    start TEXT NOT NULL,
+    end_time TEXT NOT NULL,
+    records INTEGER NOT NULL,
+    resistance REAL NOT NULL,
+    open_circuit_voltage REAL NOT NULL,
+    r_squared REAL NOT NULL,
+    mean_current REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS battery_health_log ON battery_health (log);
+CREATE TABLE IF NOT EXISTS batteries (
+    stem TEXT PRIMARY KEY,
+    battery_id TEXT NOT NULL
+)
+"""
+
+
+def file_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """Return the SHA-256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """Indexed, concurrency-safe record of which Drive files were processed."""
+
+    def __init__(self, path: str = MANIFEST_PATH, legacy_path: Optional[str] = LEGACY_EXCLUSION_FP):
+        self.path = path
+        # Imported when the database is first created, so upgrades keep their history
+        self.legacy_path = legacy_path
+        self.lock = Lock()
+        # Opened lazily, so a Manifest can be pickled into worker processes
+        # and each process gets its own connection
+        self._connection = None
+
+    def __getstate__(self):
+        return {"path": self.path, "legacy_path": self.legacy_path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"], state["legacy_path"])
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None, check_same_thread=False
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+            self._connection = connection
+            self._import_legacy()
+        return self._connection
+
+    def _import_legacy(self):
+        """Seed an empty manifest from the old exclusionListFP.txt."""
+        if not self.legacy_path or not os.path.exists(self.legacy_path):
+            return
+        if self._connection.execute("SELECT 1 FROM files LIMIT 1").fetchone():
+            return
+        with open(self.legacy_path, "r") as f:
+            names = {line.strip() for line in f if line.strip()}
+        now = time.time()
+        self._connection.executemany(
+            "INSERT OR IGNORE INTO files (name, status, updated_at) VALUES (?, ?, ?)",
+            [(name, PROCESSED, now) for name in names],
+        )
+
+    def get(self, name: str) -> Optional[dict]:
+        """Return the manifest row for name as a dict, or None."""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT name, size, modified_time, content_hash, status, outputs, updated_at"
+                " FROM files WHERE name = ?",
+                (name,),
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ("name", "size", "modified_time", "content_hash", "status", "outputs", "updated_at")
+        entry = dict(zip(keys, row))
+        entry["outputs"] = json.loads(entry["outputs"])
+        return entry
+
+    def is_processed(self, name: str, modified_time: Optional[str] = None) -> bool:
+        """Return True if name was processed (and, if given, is unchanged on Drive)."""
+        entry = self.get(name)
+        if entry is None or entry["status"] != PROCESSED:
+            return False
+        if modified_time and entry["modified_time"] and entry["modified_time"] != modified_time:
+            return False
+        return True
+
+    def record_download(self, name: str, size: Optional[int], modified_time: Optional[str]):
+        """Note a fresh download. A changed Drive modifiedTime re-queues the file."""
+        entry = self.get(name)
+        if entry is not None and (
+            not modified_time
+            or not entry["modified_time"]
+            or entry["modified_time"] == modified_time
+        ):
+            status = entry["status"]
+        else:
+            status = DOWNLOADED
+        self._upsert(name, status, size=size, modified_time=modified_time)
+
+    def mark(
+        self,
+        name: str,
+        status: str,
+        size: Optional[int] = None,
+        content_hash: Optional[str] = None,
+        outputs: Iterable[str] = (),
+    ):
+        """Set a file's status, keeping any fields not given here."""
+        self._upsert(name, status, size=size, content_hash=content_hash, outputs=list(outputs))
+
+    def get_state(self, key: str) -> Optional[str]:
+        """Return the stored value for key, or None."""
+        with self.lock:
+            row = self.connection.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_state(self, key: str, value: Optional[str]):
+        with self.lock:
+            self.connection.execute(
+                "INSERT INTO state (key, value) VALUES (?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, value),
+            )
+
+    def get_published(self, path: str) -> Optional[dict]:
+        """Return what was last published to storage path, or None."""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT source_size, source_mtime_ns, content_hash FROM published WHERE path = ?",
+                (path,),
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("source_size", "source_mtime_ns", "content_hash"), row))
+
+    def mark_published(self, path: str, source_size: int, source_mtime_ns: int, content_hash: str):
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO published"
+                " (path, source_size, source_mtime_ns, content_hash, published_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (path, source_size, source_mtime_ns, content_hash, time.time()),
+            )
+
+    def set_health(self, log: str, stem: str, fits: Iterable[tuple]):
+        """Replace the cached resistance fits of log (HEALTH_FIELDNAMES rows)."""
+        with self.lock:
+            connection = self.connection
+            connection.execute("BEGIN")
+            try:
+                connection.execute("DELETE FROM battery_health WHERE log = ?", (log,))
+                connection.executemany(
+                    "INSERT INTO battery_health (log, stem, start, end_time, records, resistance,"
+                    " open_circuit_voltage, r_squared, mean_current) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(log, stem, *fit) for fit in fits],
+                )
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    def set_battery(self, stem: str, battery_id: str):
+        """Record which battery was in the robot for the logs named stem.*"""
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO batteries (stem, battery_id) VALUES (?, ?)",
+                (stem, battery_id),
+            )
+
+    def battery_health(self) -> list:
+        """Return every cached fit, led by its log's battery_id (None until known)."""
+        with self.lock:
+            return self.connection.execute(
+                "SELECT b.battery_id, h.log, h.start, h.end_time, h.records, h.resistance,"
+                " h.open_circuit_voltage, h.r_squared, h.mean_current"
+                " FROM battery_health h LEFT JOIN batteries b ON b.stem = h.stem"
+                " ORDER BY h.log, h.start"
+            ).fetchall()
+
+    def is_settled(self, name: str, modified_time: Optional[str] = None) -> bool:
+        """Return True once name reached a final status and is unchanged on Drive."""
+        entry = self.get(name)
+        if entry is None or entry["status"] not in (PROCESSED, EMPTY, FAILED):
+            return False
+        if modified_time and entry["modified_time"] and entry["modified_time"] != modified_time:
+            return False
+        return True
+
+    def _upsert(self, name, status, size=None, modified_time=None, content_hash=None, outputs=None):
+        with self.lock:
+            self.connection.execute(
+                """
+                INSERT INTO files (name, size, modified_time, content_hash, status, outputs, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    size = COALESCE(excluded.size, size),
+                    modified_time = COALESCE(excluded.modified_time, modified_time),
+                    content_hash = COALESCE(excluded.content_hash, content_hash),
+                    status = excluded.status,
+                    outputs = CASE WHEN ? THEN excluded.outputs ELSE outputs END,
+                    updated_at = excluded.updated_at
+                """,
+                (
+                    name,
+                    size,
+                    modified_time,
+                    content_hash,
+                    status,
+                    json.dumps(outputs or []),
+                    time.time(),
+                    outputs is not None,
+                ),
+            )
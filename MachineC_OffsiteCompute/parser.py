@@ -1,26 +1,67 @@
-import dslogparser
 import csv
 import os
+import re
+from datetime import datetime
+from typing import NamedTuple, Optional, Tuple
+
+from compressed_io import detect_compression, open_compressed
+from dslogtocsvlibrary.dseventstream import DsEventStream
+from dslogtocsvlibrary.dslogstream import DsLogStream
+from DSConverter import ROW_GROUP_SIZE, SUMMARY_COLUMNS, summary_rows
+
+# "Battery: BAT-0042" / "battery id = 7" style messages, or a bare BAT-0042 tag
+BATTERY_PATTERN = re.compile(
+    r"(?i:\bbattery(?:\s*id)?\s*[:=#]\s*)([\w-]+)|\b(BAT[-_]?\d[\w-]*)"
+)
+
+
+class BatteryTag(NamedTuple):
+    battery_id: str
+    timestamp: datetime
+    message: str
+
+
+def open_log(f, compression):
+    # Plain files are memory-mapped by the streams; compressed ones are
+    # inflated into memory first
+    return f if compression == "none" else f.read()
+
 
 def parse_dslog(filepath):
     """Return a list of (time, voltage, current) tuples."""
-    parser = dslogparser.DSLogParser(filepath)
-    parser.read_records()
-    # Simplified example:
+    compression = detect_compression(filepath)
     rows = []
-    for r in parser.records:
-        rows.append((r.time, r.voltage, r.current))
+    with open_compressed(filepath, 'rb', compression) as f:
+        log_stream = DsLogStream(open_log(f, compression), columns=SUMMARY_COLUMNS)
+        for start in range(0, len(log_stream), ROW_GROUP_SIZE):
+            rows.extend(summary_rows(log_stream.to_arrays(start, start + ROW_GROUP_SIZE)))
     return rows
 
-def parse_dsevents(filepath):
-    """Return battery ID string from .dsevents file (placeholder)."""
-    with open(filepath, 'r', errors='ignore') as f:
-        text = f.read()
-    # Very rough placeholder extraction:
-    for line in text.splitlines():
-        if "Battery" in line or "BAT" in line:
-            return line.strip()
-    return "Unknown"
+
+def find_battery_tag(message: dict) -> Optional[Tuple[str, str]]:
+    # (battery id, text of the tag it was found in), e.g. from <details>
+    for value in message.values():
+        if isinstance(value, str):
+            match = BATTERY_PATTERN.search(value)
+            if match:
+                return match.group(1) or match.group(2), value
+    return None
+
+
+def parse_dsevents(filepath) -> Optional[BatteryTag]:
+    """Return the first battery tag logged in a .dsevents file, or None."""
+    # Only messages whose raw text mentions a battery get split into tags
+    compression = detect_compression(filepath)
+    with open_compressed(filepath, 'rb', compression) as f:
+        for entry in DsEventStream(open_log(f, compression)):
+            if not BATTERY_PATTERN.search(entry.text):
+                continue
+            found = find_battery_tag(entry.message)
+            if found is not None:
+                battery_id, text = found
+                return BatteryTag(battery_id, entry.date, text.strip())
+    return None
+
 
 def write_csv(rows, out_path):
     os.makedirs(os.path.dirname(out_path), exist_ok=True)
@@ -0,0 +1,95 @@
+"""Small in-process pipeline of threaded stages joined by bounded queues."""
+
+import queue
+import threading
+from typing import Any, Callable, List, Optional
+
+_DONE = object()
+
+
+class Stage:
+    """One step of a Pipeline, served by one or more worker threads."""
+
+    def __init__(self, name: str, func: Callable[[Any], Any], workers: int = 1, maxsize: int = 8):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.inbox: queue.Queue = queue.Queue(maxsize=maxsize)
+        self.next: Optional["Stage"] = None
+        self.on_done: Optional[Callable[[Any], None]] = None
+        self.failures = 0
+        self._remaining = self.workers
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        for index in range(self.workers):
+            thread = threading.Thread(
+                target=self._run, name=f"{self.name}-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def _run(self):
+        while True:
+            message = self.inbox.get()
+            if message is _DONE:
+                break
+            # Items travel with the original put() item so on_done can name it
+            origin, item = message
+            try:
+                result = self.func(item)
+            except Exception as e:
+                with self._lock:
+                    self.failures += 1
+                print(f"[!] {self.name} failed for {item}: {e}")
+                result = None
+            if result is not None and self.next is not None:
+                self.next.inbox.put((origin, result))
+            elif self.on_done is not None:
+                self.on_done(origin)
+        # The last worker out closes the next stage
+        with self._lock:
+            self._remaining -= 1
+            last = self._remaining == 0
+        if last and self.next is not None:
+            self.next.close()
+
+    def close(self):
+        for _ in range(self.workers):
+            self.inbox.put(_DONE)
+
+
+class Pipeline:
+    """A chain of Stages; items put() into the first flow through all of them."""
+
+    def __init__(self, stages: List[Stage], on_done: Optional[Callable[[Any], None]] = None):
+        self.stages = stages
+        for stage, following in zip(stages, stages[1:]):
+            stage.next = following
+        for stage in stages:
+            stage.on_done = on_done
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    def put(self, item: Any):
+        """Queue an item for the first stage (blocks while it is full)."""
+        self.stages[0].inbox.put((item, item))
+
+    def close(self):
+        """Signal that no more items will be put; stages drain, then stop."""
+        self.stages[0].close()
+
+    def join(self):
+        for stage in self.stages:
+            stage.join()
+
+    @property
+    def failures(self) -> int:
+        return sum(stage.failures for stage in self.stages)
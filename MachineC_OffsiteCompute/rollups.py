@@ -0,0 +1,165 @@
+"""1 s / 10 s / enabled-period rollups of decoded DS log telemetry, fed piece by piece."""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from dslogtocsvlibrary.entry.parse_date import format_nanoseconds
+
+# Bucket widths of the time-based tiers, in nanoseconds
+TIME_TIERS = {"1s": 1_000_000_000, "10s": 10_000_000_000}
+ENABLED_TIER = "enabled"
+TIERS = tuple(TIME_TIERS) + (ENABLED_TIER,)
+
+METRICS = ("voltage", "total_current", "can", "trip_time")
+# The to_arrays() columns the rollups are computed from
+ROLLUP_COLUMNS = ("timestamp", "voltage", "can", "trip_time", "robot_disabled", "pdp_data_currents")
+STATS = ("min", "max", "mean", "last")
+ROLLUP_FIELDNAMES = ["tier", "start", "end", "records"] + [
+    f"{metric}_{stat}" for metric in METRICS for stat in STATS
+]
+
+
+def total_current(columns: Dict[str, np.ndarray]) -> np.ndarray:
+    """Sum of all PDP channels per record; records without a PDP count as 0 A."""
+    # Channels are multiples of 1/16 A, so the float64 sum is exact in any order
+    return np.nansum(columns["pdp_data_currents"], axis=1, dtype=np.float64)
+
+
+def metric_columns(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Pick (and derive) the rolled-up metrics from to_arrays() columns."""
+    return {
+        "voltage": columns["voltage"],
+        "total_current": total_current(columns),
+        "can": columns["can"],
+        "trip_time": columns["trip_time"],
+    }
+
+
+def enabled_mask(columns: Dict[str, np.ndarray]) -> np.ndarray:
+    """True for records where the robot was enabled."""
+    # Status bits are active-low, so a set robot_disabled bit means enabled
+    return columns["robot_disabled"] == 1
+
+
+class EnabledPeriods:
+    """Numbers the enabled periods of a log fed piece by piece."""
+
+    def __init__(self):
+        # Carried over between pieces, so a period spanning two keeps one number
+        self.was_enabled = False
+        self.count = 0
+
+    def split(self, columns: Dict[str, np.ndarray]):
+        """Return (enabled mask, period number of each enabled record)."""
+        enabled = enabled_mask(columns)
+        if len(enabled) == 0:
+            return enabled, np.zeros(0, dtype=np.int64)
+        rising = enabled & ~np.r_[self.was_enabled, enabled[:-1]]
+        period = self.count + np.cumsum(rising)
+        self.count = int(period[-1])
+        self.was_enabled = bool(enabled[-1])
+        return enabled, period[enabled]
+
+
+class Rollup:
+    """Running per-bucket min, max, mean and last of every metric for one tier."""
+
+    def __init__(self, tier: str):
+        self.tier = tier
+        self.names: tuple = ()
+        # Records of the last bucket seen, which may continue in the next
+        # piece. They are reduced again together with that piece rather than
+        # merged as partial sums, so the result never depends on where the
+        # pieces were cut.
+        self.carry: Optional[tuple] = None
+
+    def add(self, keys: np.ndarray, timestamps: np.ndarray, metrics: Dict[str, np.ndarray]) -> List[tuple]:
+        """Fold in records (already sorted by bucket key) and return finished rows."""
+        if len(keys) == 0:
+            return []
+        self.names = tuple(metrics)
+        metrics = {name: np.asarray(values, dtype=np.float64) for name, values in metrics.items()}
+        if self.carry is not None:
+            carry_keys, carry_timestamps, carry_metrics = self.carry
+            keys = np.r_[carry_keys, keys]
+            timestamps = np.r_[carry_timestamps, timestamps]
+            metrics = {name: np.r_[carry_metrics[name], values] for name, values in metrics.items()}
+
+        last = np.flatnonzero(keys != keys[-1])
+        last = int(last[-1]) + 1 if len(last) else 0
+        self.carry = (keys[last:], timestamps[last:], {name: values[last:] for name, values in metrics.items()})
+        if last == 0:
+            return []
+        return self._rows(self._buckets(keys[:last], timestamps[:last], {name: values[:last] for name, values in metrics.items()}))
+
+    def close(self) -> List[tuple]:
+        carry, self.carry = self.carry, None
+        return self._rows(self._buckets(*carry)) if carry is not None else []
+
+    def _buckets(self, keys: np.ndarray, timestamps: np.ndarray, metrics: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        ends = np.r_[starts[1:], len(keys)]
+        buckets = {
+            "key": keys[starts],
+            "start": timestamps[starts],
+            "end": timestamps[ends - 1],
+            "records": ends - starts,
+        }
+        for name, values in metrics.items():
+            buckets[f"{name}_min"] = np.minimum.reduceat(values, starts)
+            buckets[f"{name}_max"] = np.maximum.reduceat(values, starts)
+            buckets[f"{name}_sum"] = np.add.reduceat(values, starts)
+            buckets[f"{name}_last"] = values[ends - 1]
+        return buckets
+
+    def _rows(self, buckets: Dict[str, np.ndarray]) -> List[tuple]:
+        # Subclasses override this to turn finished buckets into other rows
+        count = len(buckets["key"])
+        if count == 0:
+            return []
+        records = buckets["records"]
+        columns = [
+            [self.tier] * count,
+            format_nanoseconds(buckets["start"]),
+            format_nanoseconds(buckets["end"]),
+            records.tolist(),
+        ]
+        for name in self.names:
+            columns.append(buckets[f"{name}_min"].tolist())
+            columns.append(buckets[f"{name}_max"].tolist())
+            columns.append((buckets[f"{name}_sum"] / records).tolist())
+            columns.append(buckets[f"{name}_last"].tolist())
+        return list(zip(*columns))
+
+
+class Rollups:
+    """All rollup tiers of one log, fed piece by piece."""
+
+    def __init__(self):
+        self.tiers = {tier: Rollup(tier) for tier in TIERS}
+        self.periods = EnabledPeriods()
+
+    def add(self, columns: Dict[str, np.ndarray]) -> List[tuple]:
+        """Fold in one piece of to_arrays() columns; return finished rows."""
+        timestamps = columns["timestamp"]
+        if len(timestamps) == 0:
+            return []
+        metrics = metric_columns(columns)
+        rows = []
+        for tier, width in TIME_TIERS.items():
+            rows += self.tiers[tier].add(timestamps // width, timestamps, metrics)
+
+        enabled, period = self.periods.split(columns)
+        rows += self.tiers[ENABLED_TIER].add(
+            period,
+            timestamps[enabled],
+            {name: values[enabled] for name, values in metrics.items()},
+        )
+        return rows
+
+    def close(self) -> List[tuple]:
+        rows = []
+        for rollup in self.tiers.values():
+            rows += rollup.close()
+        return rows
@@ -0,0 +1,122 @@
+import hashlib
+
+import pytest
+
+pytest.importorskip("dotenv")
+pytest.importorskip("google_auth_oauthlib")
+
+import httplib2
+
+import drive_sync
+from drive_sync import ChecksumMismatch, download_file
+
+BODY = bytes(range(256)) * 1000
+MD5 = hashlib.md5(BODY).hexdigest()
+CHUNK = 64 * 1024
+
+
+class FakeHttp:
+    """Serves BODY for Range requests, like Drive's media endpoint."""
+
+    def __init__(self, corrupt=0, fail_at=None, error=ConnectionResetError):
+        self.starts = []
+        self.corrupt = corrupt  # number of transfers whose first byte is flipped
+        self.fail_at = fail_at  # raise error once on the request at this offset
+        self.error = error
+
+    def request(self, uri, method="GET", headers=None, **kwargs):
+        start, end = map(int, headers["range"].split("=")[1].split("-"))
+        self.starts.append(start)
+        if start == self.fail_at:
+            self.fail_at = None
+            raise self.error("connection dropped")
+        if start >= len(BODY):
+            return httplib2.Response({"status": 416, "content-range": f"bytes */{len(BODY)}"}), b""
+        content = BODY[start:end + 1]
+        if start == 0 and self.corrupt:
+            self.corrupt -= 1
+            content = bytes([content[0] ^ 0xFF]) + content[1:]
+        end = start + len(content) - 1
+        return httplib2.Response({"status": 206, "content-range": f"bytes {start}-{end}/{len(BODY)}"}), content
+
+
+class FakeRequest:
+    def __init__(self, http):
+        self.uri = "https://drive.invalid/files/id1?alt=media"
+        self.headers = {}
+        self.http = http
+
+
+class FakeService:
+    def __init__(self, http):
+        self.http = http
+
+    def files(self):
+        return self
+
+    def get_media(self, fileId):
+        return FakeRequest(self.http)
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(drive_sync, "RETRY_BACKOFF", 0.0)
+
+
+def test_download_renames_part_into_place(tmp_path):
+    dest = tmp_path / "match_1.dslog"
+    download_file(FakeService(FakeHttp()), "id1", str(dest), chunk_size=CHUNK, revision=MD5, md5=MD5)
+    assert dest.read_bytes() == BODY
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["match_1.dslog"]
+
+
+def test_download_resumes_part_of_same_revision(tmp_path):
+    dest = tmp_path / "match_1.dslog"
+    (tmp_path / "match_1.dslog.part").write_bytes(BODY[:100000])
+    (tmp_path / "match_1.dslog.part.rev").write_text(MD5)
+    http = FakeHttp()
+    download_file(FakeService(http), "id1", str(dest), chunk_size=CHUNK, revision=MD5, md5=MD5)
+    assert http.starts[0] == 100000
+    assert dest.read_bytes() == BODY
+
+
+def test_download_discards_part_of_other_revision(tmp_path):
+    dest = tmp_path / "match_1.dslog"
+    (tmp_path / "match_1.dslog.part").write_bytes(b"old revision")
+    (tmp_path / "match_1.dslog.part.rev").write_text("0" * 32)
+    http = FakeHttp()
+    download_file(FakeService(http), "id1", str(dest), chunk_size=CHUNK, revision=MD5, md5=MD5)
+    assert http.starts[0] == 0
+    assert dest.read_bytes() == BODY
+
+
+def test_download_resumes_after_dropped_connection(tmp_path):
+    dest = tmp_path / "match_1.dslog"
+    http = FakeHttp(fail_at=2 * CHUNK)
+    download_file(FakeService(http), "id1", str(dest), chunk_size=CHUNK, md5=MD5)
+    assert http.starts.count(2 * CHUNK) == 2
+    assert http.starts.count(0) == 1
+    assert dest.read_bytes() == BODY
+
+
+def test_download_does_not_retry_other_errors(tmp_path):
+    http = FakeHttp(fail_at=0, error=PermissionError)
+    with pytest.raises(PermissionError):
+        download_file(FakeService(http), "id1", str(tmp_path / "match_1.dslog"), chunk_size=CHUNK)
+    assert http.starts == [0]
+
+
+def test_md5_mismatch_is_retried_from_scratch(tmp_path):
+    dest = tmp_path / "match_1.dslog"
+    http = FakeHttp(corrupt=1)
+    download_file(FakeService(http), "id1", str(dest), chunk_size=CHUNK, md5=MD5)
+    assert http.starts.count(0) == 2
+    assert dest.read_bytes() == BODY
+
+
+def test_md5_mismatch_gives_up_without_leaving_files(tmp_path):
+    http = FakeHttp(corrupt=10)
+    with pytest.raises(ChecksumMismatch):
+        download_file(FakeService(http), "id1", str(tmp_path / "match_1.dslog"), chunk_size=CHUNK, md5=MD5, retries=2)
+    assert http.starts.count(0) == 3
+    assert list(tmp_path.iterdir()) == []
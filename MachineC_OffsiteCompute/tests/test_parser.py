@@ -0,0 +1,41 @@
+import struct
+
+from parser import BatteryTag, find_battery_tag, parse_dsevents
+
+
+def event(details):
+    return (
+        "<TagVersion>1 <time> 12.345 <count> 1 <flags> 0 <Code> 44004 "
+        f"<details> {details} <location> Driver Station <stack> "
+    ).encode("ascii")
+
+
+def write_dsevents(path, messages):
+    data = bytearray(struct.pack(">iqQ", 4, 3792000000, 0))
+    for index, message in enumerate(messages):
+        data += struct.pack(">qQi", 3792000000 + index, 0, len(message)) + message
+    path.write_bytes(bytes(data))
+    return str(path)
+
+
+def test_find_battery_tag_returns_matching_field():
+    message = {"TagVersion": 1, "details": "Battery: BAT-0042", "location": "Driver Station"}
+    assert find_battery_tag(message) == ("BAT-0042", "Battery: BAT-0042")
+    assert find_battery_tag({"details": "Info 3"}) is None
+
+
+def test_parse_dsevents_message_is_the_matching_tag(tmp_path):
+    path = write_dsevents(tmp_path / "match_1.dsevents", [
+        event("Info 0"),
+        event("Battery: BAT-0042 installed"),
+        event("Battery: BAT-0099"),
+    ])
+    tag = parse_dsevents(path)
+    assert isinstance(tag, BatteryTag)
+    assert tag.battery_id == "BAT-0042"
+    assert tag.message == "Battery: BAT-0042 installed"
+
+
+def test_parse_dsevents_without_battery(tmp_path):
+    path = write_dsevents(tmp_path / "match_2.dsevents", [event("Info 0"), event("Info 1")])
+    assert parse_dsevents(path) is None